@@ -1,6 +1,18 @@
 from config.config import Config
-from openai import AzureOpenAI, AsyncAzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI, OpenAIError, RateLimitError
 from adapters.logger import logger
+from adapters.llm_cache import LLMResponseCache, SingleFlight, make_cache_key
+from adapters.llm_resilience import CircuitBreaker, LatencyTracker, STATE_OPEN
+from adapters.llm_scheduler import (
+    LLMScheduler,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_DEFAULT,
+    PRIORITY_BACKGROUND,
+    estimate_prompt_tokens,
+)
+from pathlib import Path
+from typing import Optional
+import httpx
 import time
 import random
 import asyncio
@@ -121,78 +133,384 @@ class AzureOpenAIHelper:
                 continue
 
 
+# Returned by get_response when no completion could be obtained; callers fall back on it
+LLM_NOT_RESPONDING = "Azure OpenAI Not Responding"
+
+_shared_async_client: Optional[AsyncAzureOpenAI] = None
+_shared_llm = None
+_shared_scheduler: Optional[LLMScheduler] = None
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def _create_async_client() -> AsyncAzureOpenAI:
+    """
+    Builds the AsyncAzureOpenAI client with a tuned HTTP connection pool.
+    Pool limits, keep-alive and timeouts come from Config.LLM_*. Raises OpenAIError
+    before building the pool when the endpoint or key is missing.
+    """
+    if not Config.AZURE_OPENAI_ENDPOINT or not Config.AZURE_OPENAI_KEY:
+        raise OpenAIError("Missing credentials: set Config.AZURE_OPENAI_ENDPOINT and Config.AZURE_OPENAI_KEY")
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=Config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(Config.LLM_REQUEST_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+    )
+    client = AsyncAzureOpenAI(
+        azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
+        api_key=Config.AZURE_OPENAI_KEY,
+        api_version=Config.AZURE_OPENAI_VERSION,
+        http_client=http_client,
+    )
+    logger.info("STATUS: AzureOpenAI Client Initialized Successfully!")
+    return client
+
+
+def get_async_client() -> AsyncAzureOpenAI:
+    """
+    Returns the process-wide AsyncAzureOpenAI client, creating it on first use.
+    Raises OpenAIError when it can't be created (e.g. missing credentials).
+    """
+    global _shared_async_client
+    if _shared_async_client is None:
+        _shared_async_client = _create_async_client()
+    return _shared_async_client
+
+
+def llm_available() -> bool:
+    """
+    True if the shared client exists or can be created now.
+    """
+    try:
+        get_async_client()
+    except OpenAIError:
+        return False
+    return True
+
+
+async def startup_llm_client():
+    """
+    Creates the shared client (called from the FastAPI lifespan) so the first
+    request doesn't pay for client construction. Without credentials the client
+    stays unset and the rest of the app still starts; LLM routes answer 503.
+    """
+    try:
+        get_async_client()
+    except OpenAIError as e:
+        logger.error(f"Azure OpenAI client not created, LLM features are unavailable: {e}")
+
+
+async def shutdown_llm_client():
+    """
+    Closes the shared client and its connection pool (called from the FastAPI lifespan).
+    """
+    global _shared_async_client
+    if _shared_async_client is not None:
+        await _shared_async_client.close()
+        _shared_async_client = None
+        logger.info("STATUS: AzureOpenAI Client Closed")
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    Returns the process-wide LLM scheduler (concurrency cap + tokens-per-minute budget).
+    """
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = LLMScheduler(
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            tokens_per_minute=Config.LLM_TOKENS_PER_MINUTE,
+        )
+    return _shared_scheduler
+
+
+def _retry_after_seconds(ex: Exception, default: float) -> float:
+    """Reads the Retry-After hint from a 429 response, if present"""
+    response = getattr(ex, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000.0 if header == "retry-after-ms" else seconds
+    return default
+
+
+def get_llm() -> "AsyncAzureOpenAIHelper":
+    """
+    Returns the shared AsyncAzureOpenAIHelper used by all routers and services.
+    """
+    global _shared_llm
+    if _shared_llm is None:
+        _shared_llm = AsyncAzureOpenAIHelper()
+    return _shared_llm
+
+
 class AsyncAzureOpenAIHelper:
     """
     Unified helper class for Azure OpenAI chat, streaming, and embedding functionalities.
+    All instances share the process-wide client from get_async_client() and the
+    scheduler from get_scheduler(); every call takes a scheduler slot at the given
+    priority (PRIORITY_INTERACTIVE, PRIORITY_DEFAULT or PRIORITY_BACKGROUND).
     """
 
     def __init__(self):
         self.azure_endpoint = Config.AZURE_OPENAI_ENDPOINT
         self.api_key = Config.AZURE_OPENAI_KEY
         self.api_version = Config.AZURE_OPENAI_VERSION
-
-        self.client = AsyncAzureOpenAI(
-            azure_endpoint=self.azure_endpoint,
-            api_key=self.api_key,
-            api_version=self.api_version,
+        self.cache = None
+        self.single_flight = SingleFlight()
+        self.breaker = CircuitBreaker(
+            window=Config.LLM_BREAKER_WINDOW,
+            min_calls=Config.LLM_BREAKER_MIN_CALLS,
+            failure_rate=Config.LLM_BREAKER_FAILURE_RATE,
+            slow_call_seconds=Config.LLM_BREAKER_SLOW_CALL_SECONDS,
+            open_seconds=Config.LLM_BREAKER_OPEN_SECONDS,
+            probe_timeout=Config.LLM_CALL_TIMEOUT,
         )
-        logger.info("STATUS: AzureOpenAI Client Initialized Successfully!")
+        self.latency = LatencyTracker()
+        self.hedges = 0
+        self.hedge_wins = 0
+        if Config.LLM_CACHE_ENABLED:
+            persist_path = Config.LLM_CACHE_PERSIST_PATH
+            if persist_path and not Path(persist_path).is_absolute():
+                persist_path = BACKEND_DIR / persist_path
+            self.cache = LLMResponseCache(
+                max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=Config.LLM_CACHE_TTL_SECONDS,
+                persist_path=persist_path or None,
+            )
+
+    @property
+    def client(self) -> AsyncAzureOpenAI:
+        return get_async_client()
+
+    @property
+    def scheduler(self) -> LLMScheduler:
+        return get_scheduler()
 
-    async def get_response(self, prompt, json_mode=False, model=Config.GPT_GENERATION_4O_MINI_MODEL):
+    def stats(self) -> dict:
+        """
+        Returns cache, request coalescing, scheduler and upstream health counters for monitoring.
+        """
+        return {
+            "cache": self.cache.stats() if self.cache else None,
+            "single_flight": self.single_flight.stats(),
+            "scheduler": self.scheduler.stats(),
+            "circuit": self.breaker.stats(),
+            "latency": self.latency.stats(),
+            "hedging": {
+                "enabled": Config.LLM_HEDGING_ENABLED,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            },
+        }
+
+    async def get_response(self, prompt, json_mode=False, model=Config.GPT_GENERATION_4O_MINI_MODEL, use_cache=True,
+                           priority=PRIORITY_DEFAULT):
         """
         Sends a non-streaming chat request and returns the response content.
+
+        Identical (model, messages, json_mode) requests are served from the response
+        cache; pass use_cache=False to force a fresh completion. Concurrent identical
+        requests share one upstream call. Cache misses wait for a scheduler slot at
+        the given priority (the first caller's priority for coalesced requests).
+        """
+        key = make_cache_key(model, prompt, json_mode)
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async def fetch():
+            content = await self._request_completion(prompt, json_mode, model, priority)
+            if self.cache is not None and content and content != LLM_NOT_RESPONDING:
+                self.cache.set(key, content)
+            return content
+
+        # Fresh (use_cache=False) requests only coalesce with other fresh requests
+        flight_key = key if use_cache else f"fresh:{key}"
+        return await self.single_flight.run(flight_key, fetch)
+
+    async def _request_completion(self, prompt, json_mode, model, priority=PRIORITY_DEFAULT):
         """
+        Calls Azure OpenAI with retries; returns LLM_NOT_RESPONDING on failure.
+        Each attempt holds a scheduler slot only while the request is in flight and
+        is bounded by Config.LLM_CALL_TIMEOUT. While the circuit breaker is open
+        no request is sent and LLM_NOT_RESPONDING is returned immediately, so
+        callers drop straight to their fallbacks.
+        """
+        estimated_tokens = estimate_prompt_tokens(prompt) + Config.LLM_COMPLETION_TOKEN_ESTIMATE
+        params = {
+            "model": model,
+            "temperature": 0,
+            "seed": 123,
+            "messages": prompt
+        }
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+
+        hedge = Config.LLM_HEDGING_ENABLED and priority < PRIORITY_BACKGROUND
         for delay_secs in (2**x for x in range(0, 2)):
+            if not self.breaker.allow_request():
+                logger.warning("Azure OpenAI circuit open, skipping chat request")
+                return LLM_NOT_RESPONDING
             try:
                 start = time.time()
-                params = {
-                    "model": model,
-                    "temperature": 0,
-                    "seed": 123,
-                    "messages": prompt
-                }
-
-                if json_mode:
-                    params["response_format"] = {"type": "json_object"}
-
-                response = await self.client.chat.completions.create(**params)
-                content = response.choices[0].message.content
+                if hedge:
+                    content = await self._hedged_attempt(params, priority, estimated_tokens)
+                else:
+                    content = await self._completion_attempt(params, priority, estimated_tokens)
                 end=time.time()
                 logger.info(f"Chat response received in {end - start:.3f} seconds.")
                 return content
 
+            except RateLimitError as ex:
+                retry_after = _retry_after_seconds(ex, delay_secs)
+                logger.warning(f"Azure OpenAI rate limited, retrying in {retry_after:.1f}s")
+                self.scheduler.throttle(retry_after)
             except Exception as ex:
-                logger.error(f"Azure OpenAI chat request failed: {ex}", exc_info=True)
+                logger.error(f"Azure OpenAI chat request failed: {ex!r}", exc_info=True)
+                if self.breaker.state == STATE_OPEN:
+                    # This failure opened the circuit - don't wait to retry
+                    return LLM_NOT_RESPONDING
                 await asyncio.sleep(delay_secs + random.uniform(0, 1))
-        return "Azure OpenAI Not Responding"
+        return LLM_NOT_RESPONDING
 
-    async def stream_chat_response(self, prompt, model=Config.GPT_GENERATION_4O_MINI_MODEL):
+    async def _completion_attempt(self, params, priority, estimated_tokens):
+        """
+        One chat completion call under a scheduler slot and the per-call timeout.
+        Outcomes feed the circuit breaker and the latency tracker.
+        """
+        async with self.scheduler.slot(priority, estimated_tokens) as usage:
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**params),
+                    timeout=Config.LLM_CALL_TIMEOUT
+                )
+            except RateLimitError:
+                # Quota, not upstream health - handled by the scheduler
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            latency = time.monotonic() - start
+            self.breaker.record_success(latency)
+            self.latency.add(latency)
+            if response.usage is not None:
+                usage["tokens"] = response.usage.total_tokens
+        return response.choices[0].message.content
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Delay before a hedged second attempt: the recent p95 latency, once there is enough data"""
+        if len(self.latency) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return max(self.latency.percentile(95), Config.LLM_HEDGE_MIN_DELAY)
+
+    async def _hedged_attempt(self, params, priority, estimated_tokens):
+        """
+        Runs one attempt and, if it hasn't answered within the hedge delay, a second
+        identical one. The first successful answer wins and the other is cancelled.
+        """
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._completion_attempt(params, priority, estimated_tokens))
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.breaker.allow_request():
+                self.hedges += 1
+                hedge = asyncio.ensure_future(self._completion_attempt(params, priority, estimated_tokens))
+                pending.add(hedge)
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_chat_response(self, prompt, model=Config.GPT_GENERATION_4O_MINI_MODEL, json_mode=False,
+                                   priority=PRIORITY_INTERACTIVE):
         """
         Streams chat responses asynchronously from Azure OpenAI.
+        With json_mode=True the streamed text is a single JSON object.
+        The scheduler slot is held until the stream finishes. Upstream errors are
+        logged and re-raised, so callers can tell a cut-off answer from a complete one.
         """
+        estimated_tokens = estimate_prompt_tokens(prompt) + Config.LLM_COMPLETION_TOKEN_ESTIMATE
+        if not self.breaker.allow_request():
+            logger.warning("Azure OpenAI circuit open, skipping streaming request")
+            return
         try:
-            response = await self.client.chat.completions.create(
-                model=model,
-                temperature=0,
-                messages=prompt,
-                stream=True
-            )
-            async for chunk in response:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            params = {
+                "model": model,
+                "temperature": 0,
+                "messages": prompt,
+                "stream": True
+            }
+            if json_mode:
+                params["seed"] = 123
+                params["response_format"] = {"type": "json_object"}
+            async with self.scheduler.slot(priority, estimated_tokens):
+                start = time.monotonic()
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**params),
+                    timeout=Config.LLM_CALL_TIMEOUT
+                )
+                first_chunk = True
+                async for chunk in response:
+                    if first_chunk:
+                        # Upstream health is judged on time to first token
+                        first_chunk = False
+                        latency = time.monotonic() - start
+                        self.breaker.record_success(latency)
+                        self.latency.add(latency)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except RateLimitError as e:
+            self.scheduler.throttle(_retry_after_seconds(e, 1.0))
+            logger.error(f"Streaming chat rate limited: {e}")
+            raise
         except Exception as e:
-            logger.error(f"Streaming chat error: {e}", exc_info=True)
+            self.breaker.record_failure()
+            logger.error(f"Streaming chat error: {e!r}", exc_info=True)
+            raise
 
-    async def generate_embeddings(self, text, model=Config.GPT_EMBEDDING_MODEL):
+    async def generate_embeddings(self, text, model=Config.GPT_EMBEDDING_MODEL, priority=PRIORITY_BACKGROUND):
         """
         Generates embeddings for input text using Azure OpenAI.
         """
+        estimated_tokens = len(text) // 4 + 1
         for delay_secs in (2**x for x in range(0, 2)):
             try:
                 logger.info(f"Generating embeddings using model: {model}")
                 start = time.time()
 
-                embedding = await self.client.embeddings.create(input=[text], model=model)
+                async with self.scheduler.slot(priority, estimated_tokens) as usage:
+                    embedding = await self.client.embeddings.create(input=[text], model=model)
+                    if embedding.usage is not None:
+                        usage["tokens"] = embedding.usage.total_tokens
                 result = embedding.data[0].embedding
 
                 end = time.time()
@@ -0,0 +1,173 @@
+"""
+Deterministic LLM response cache.
+
+Completions are requested with temperature=0 and a fixed seed, so identical prompts
+give practically identical answers. Responses are cached by a hash of
+(model, messages, json_mode) in a bounded in-memory LRU with a TTL, optionally
+backed by a SQLite file so entries survive restarts. Concurrent misses for the
+same key are coalesced by SingleFlight so only one upstream call is made.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from adapters.logger import logger
+
+
+def make_cache_key(model: str, messages: List[Dict], json_mode: bool) -> str:
+    """Stable hash of everything that determines a completion"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "json_mode": bool(json_mode)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Bounded LRU + TTL cache for LLM responses with optional on-disk persistence.
+
+    Attributes:
+        max_entries (int): Maximum number of in-memory entries before LRU eviction.
+        ttl_seconds (float): Age after which an entry is treated as missing.
+        persist_path (Path): SQLite file used for persistence, or None for memory only.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if self.persist_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.persist_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Drop anything that expired while the process was down
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        except Exception as e:
+            logger.error(f"LLM cache persistence disabled: {e}")
+            self._db = None
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return (time.time() - created_at) < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if self._is_fresh(created_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except Exception as e:
+                    logger.error(f"LLM cache read failed: {e}")
+                    row = None
+                if row is not None and self._is_fresh(row[1]):
+                    self._store_in_memory(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def _store_in_memory(self, key: str, response: str, created_at: float):
+        self._entries[key] = (response, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key: str, response: str):
+        """Store a response"""
+        created_at = time.time()
+        with self._lock:
+            self._store_in_memory(key, response, created_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, created_at)
+                    )
+                except Exception as e:
+                    logger.error(f"LLM cache write failed: {e}")
+
+    def clear(self):
+        """Drop every entry (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "persistent": self._db is not None,
+            }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the work,
+    later callers await the same task and get the same result.
+
+    Attributes:
+        coalesced (int): Number of calls that joined an in-flight task instead of starting one.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable]):
+        """Run factory() for key, or join the call already in flight for it"""
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            task = loop.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded so one caller giving up doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict:
+        return {"coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,144 @@
+"""
+Upstream health tracking for LLM calls.
+
+CircuitBreaker stops sending requests to Azure OpenAI once too many recent calls
+failed or were slow, so callers fall back immediately instead of waiting out
+timeouts and retries; after a cool-down it lets a single probe through to detect
+recovery. LatencyTracker keeps recent call latencies for percentiles (used to
+pick the hedging delay).
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from adapters.logger import logger
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at the given percentile (0-100), or None without samples"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def stats(self) -> Dict:
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+        return {
+            "samples": len(self),
+            "p50": rounded(self.percentile(50)),
+            "p95": rounded(self.percentile(95)),
+            "p99": rounded(self.percentile(99)),
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed -> open -> half-open circuit breaker over a sliding window of call outcomes.
+
+    A call counts as failed if it raised or took longer than slow_call_seconds. The
+    circuit opens once at least min_calls outcomes are recorded and the failure rate
+    reaches failure_rate. After open_seconds it half-opens and allows one probe: a
+    successful probe closes the circuit, a failed one re-opens it.
+
+    Attributes:
+        window (int): Number of recent outcomes considered.
+        min_calls (int): Outcomes required before the circuit can open.
+        failure_rate (float): Failure ratio (0-1) that opens the circuit.
+        slow_call_seconds (float): Latency above which a successful call counts as failed.
+        open_seconds (float): Time the circuit stays open before probing.
+        probe_timeout (float): Time after which an unanswered probe is replaced by a new one.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 10, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 15.0, open_seconds: float = 30.0, probe_timeout: float = 30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        self.state = STATE_CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """True if a call may be sent upstream now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = STATE_HALF_OPEN
+                self._probe_started_at = now
+                logger.info("LLM circuit half-open, sending probe request")
+                return True
+            if self.state == STATE_HALF_OPEN and now - self._probe_started_at >= self.probe_timeout:
+                # The previous probe never reported back
+                self._probe_started_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                self.state = STATE_CLOSED
+                self._outcomes.clear()
+                logger.info("LLM circuit closed, upstream recovered")
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if self.state == STATE_CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"LLM circuit opened, failing fast for {self.open_seconds:.0f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = len(self._outcomes)
+            return {
+                "state": self.state,
+                "failure_rate": round(self._outcomes.count(False) / total, 4) if total else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
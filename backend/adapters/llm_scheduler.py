@@ -0,0 +1,188 @@
+"""
+LLM request scheduler.
+
+Every Azure OpenAI call takes a slot from one process-wide scheduler before it is
+sent. The scheduler enforces a global concurrency cap and a tokens-per-minute
+budget (token bucket), and hands out slots in priority order so interactive work
+(triage turns, doctor chat) goes ahead of background work (queue summaries,
+appointment notes, KPI extraction) when the quota is tight.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from adapters.logger import logger
+
+# Priority classes - lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    """Rough token count of a chat prompt (~4 characters per token plus per-message overhead)"""
+    total = 0
+    for message in messages or []:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        total += len(content) // 4 + 4
+    return total + 2
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "future", "enqueued_at")
+
+    def __init__(self, priority: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    Priority-aware concurrency limiter with a tokens-per-minute token bucket.
+
+    Slots are granted strictly in (priority, arrival) order: a request only starts
+    when it is at the head of the queue, a concurrency slot is free and the bucket
+    holds enough tokens for its estimate. The estimate is reconciled with the real
+    usage reported by the API when the slot is released.
+
+    Attributes:
+        max_concurrency (int): Maximum number of in-flight LLM calls.
+        tokens_per_minute (int): Token budget per minute; 0 disables rate limiting.
+    """
+
+    def __init__(self, max_concurrency: int = 16, tokens_per_minute: int = 0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self._capacity = float(self.tokens_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._refill_rate = self.tokens_per_minute / 60.0
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self._throttled = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._refill_rate:
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._refill_rate)
+        self._last_refill = now
+
+    def _cost(self, tokens: int) -> float:
+        # A single request larger than the whole bucket would otherwise wait forever
+        return float(min(max(tokens, 0), self._capacity)) if self._capacity else 0.0
+
+    def _dispatch(self):
+        """Grant slots to waiters at the head of the queue while capacity allows"""
+        self._refill()
+        while self._queue and self._active < self.max_concurrency:
+            waiter = self._queue[0][2]
+            if waiter.future.done():
+                # Cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+
+            now = time.monotonic()
+            delay = self._paused_until - now
+            cost = self._cost(waiter.tokens)
+            if delay <= 0 and self._tokens < cost:
+                delay = (cost - self._tokens) / self._refill_rate
+            if delay > 0:
+                self._schedule_wakeup(delay)
+                return
+
+            heapq.heappop(self._queue)
+            self._tokens -= cost
+            self._active += 1
+            name = PRIORITY_NAMES.get(waiter.priority, "default")
+            self._granted[name] = self._granted.get(name, 0) + 1
+            self._wait_seconds[name] = self._wait_seconds.get(name, 0.0) + (now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, priority: int = PRIORITY_DEFAULT, tokens: int = 0):
+        """Wait for a slot; must be paired with release()"""
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(priority, tokens, future)
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled - hand it back unused
+                self.release(tokens, 0)
+            else:
+                self._dispatch()
+            raise
+
+    def release(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None):
+        """Free a slot and correct the bucket with the real token usage, if known"""
+        self._active = max(0, self._active - 1)
+        if actual_tokens is not None and self._capacity:
+            self._refill()
+            correction = self._cost(estimated_tokens) - actual_tokens
+            self._tokens = min(self._capacity, self._tokens + correction)
+        self._dispatch()
+
+    def throttle(self, retry_after: float):
+        """Pause all dispatching after the API signalled a rate limit (HTTP 429)"""
+        self._throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + max(retry_after, 0.0))
+        logger.warning(f"LLM scheduler throttled for {retry_after:.1f}s")
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_DEFAULT, tokens: int = 0):
+        """
+        Async context manager around acquire()/release(). The yielded dict can be
+        given the real usage as usage["tokens"] before the block exits.
+        """
+        await self.acquire(priority, tokens)
+        usage = {"tokens": None}
+        try:
+            yield usage
+        finally:
+            self.release(tokens, usage["tokens"])
+
+    def stats(self) -> Dict:
+        """Queue depth, in-flight calls, remaining budget and per-priority wait times"""
+        self._refill()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": sum(1 for _, _, waiter in self._queue if not waiter.future.done()),
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_available": int(self._tokens) if self._capacity else None,
+            "throttled": self._throttled,
+            "granted": dict(self._granted),
+            "avg_wait_seconds": {
+                name: round(self._wait_seconds[name] / count, 4) if count else 0.0
+                for name, count in self._granted.items()
+            },
+        }
@@ -1,8 +1,37 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 import azure.cognitiveservices.speech as speechsdk
 from config.config import Config
 import time
 
+# Dedicated threads for file transcription, so recognition never runs on the event loop
+_transcription_pool: Optional[ThreadPoolExecutor] = None
+_transcription_pool_lock = threading.Lock()
+
+
+def get_transcription_pool() -> ThreadPoolExecutor:
+    """Shared transcription worker pool (created on first use)"""
+    global _transcription_pool
+    with _transcription_pool_lock:
+        if _transcription_pool is None:
+            _transcription_pool = ThreadPoolExecutor(
+                max_workers=Config.TRANSCRIPTION_WORKERS,
+                thread_name_prefix="transcription"
+            )
+        return _transcription_pool
+
+
+def shutdown_transcription_pool():
+    """Stop the transcription workers (called on application shutdown)"""
+    global _transcription_pool
+    with _transcription_pool_lock:
+        if _transcription_pool is not None:
+            _transcription_pool.shutdown(wait=False, cancel_futures=True)
+            _transcription_pool = None
+
+
 class AzureSpeechHelper:
     def __init__(self):
         self.speech_key = Config.SPEECH_KEY
@@ -121,9 +150,9 @@ class AzureSpeechHelper:
                 auto_detect_source_language_config=auto_detect_source_language_config
             )
 
-            # Storage for transcription results
+            # Storage for transcription results; done is set by the stop/cancel callbacks
             transcription_results = []
-            done = False
+            done = threading.Event()
 
             def recognized_cb(evt):
                 """Callback for recognized speech"""
@@ -133,17 +162,15 @@ class AzureSpeechHelper:
 
             def session_stopped_cb(evt):
                 """Callback for session stopped"""
-                nonlocal done
                 print("Session stopped.")
-                done = True
+                done.set()
 
             def canceled_cb(evt):
                 """Callback for canceled recognition"""
-                nonlocal done
                 print(f"Recognition canceled: {evt.cancellation_details.reason}")
                 if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
                     print(f"Error details: {evt.cancellation_details.error_details}")
-                done = True
+                done.set()
 
             # Connect callbacks
             speech_recognizer.recognized.connect(recognized_cb)
@@ -155,9 +182,8 @@ class AzureSpeechHelper:
             speech_recognizer.start_continuous_recognition()
 
             # Wait for recognition to complete
-            import time
-            while not done:
-                time.sleep(0.5)
+            if not done.wait(timeout=Config.TRANSCRIPTION_TIMEOUT):
+                print(f"Transcription timed out after {Config.TRANSCRIPTION_TIMEOUT}s, returning partial transcript")
 
             speech_recognizer.stop_continuous_recognition()
 
@@ -170,3 +196,41 @@ class AzureSpeechHelper:
         except Exception as e:
             print(f"Error transcribing audio file: {e}")
             return ""
+
+
+class SpeechToTextBackend:
+    """
+    Base interface for speech-to-text engines used to transcribe recordings.
+
+    transcribe_file is blocking and is called from the transcription worker pool,
+    possibly for several files at once.
+    """
+
+    def transcribe_file(self, audio_file_path: str) -> str:
+        raise NotImplementedError
+
+
+class AzureSpeechBackend(SpeechToTextBackend):
+    """Azure Speech continuous recognition (see AzureSpeechHelper.transcribe_from_file)"""
+
+    def transcribe_file(self, audio_file_path: str) -> str:
+        return AzureSpeechHelper().transcribe_from_file(audio_file_path)
+
+
+# Available engines by Config.STT_BACKEND name
+STT_BACKENDS = {
+    "azure": AzureSpeechBackend,
+}
+
+
+def register_stt_backend(name: str, factory: Callable[[], SpeechToTextBackend]):
+    """Make another speech-to-text engine selectable through Config.STT_BACKEND"""
+    STT_BACKENDS[name] = factory
+
+
+def get_stt_backend() -> SpeechToTextBackend:
+    """The speech-to-text engine selected by Config.STT_BACKEND"""
+    factory = STT_BACKENDS.get(Config.STT_BACKEND)
+    if factory is None:
+        raise ValueError(f"Unknown speech-to-text backend: {Config.STT_BACKEND}")
+    return factory()
@@ -0,0 +1,374 @@
+"""
+Pluggable storage layer for appointments, patient queue, medical records, consultations and background jobs.
+
+Two backends are available:
+- JSONStorageBackend: the original flat JSON files (default)
+- SQLiteStorageBackend: a local SQLite database in WAL mode with one table per collection
+
+The backend is selected with Config.STORAGE_BACKEND ("json" or "sqlite").
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.config import Config
+from adapters.logger import logger
+
+# Paths - organized by patient and doctor folders
+BACKEND_DIR = Path(__file__).parent.parent
+DATA_DIR = BACKEND_DIR / "data"
+PATIENT_DIR = DATA_DIR / "patient"
+DOCTOR_DIR = DATA_DIR / "doctor"
+PATIENT_DIR.mkdir(parents=True, exist_ok=True)
+DOCTOR_DIR.mkdir(parents=True, exist_ok=True)
+
+DEFAULT_SQLITE_PATH = DATA_DIR / "mediverse.db"
+
+# Collection definitions: backing JSON file, root key in that file,
+# primary key field and secondary fields that get an index.
+COLLECTIONS = {
+    "appointments": {
+        "file": DOCTOR_DIR / "appointments.json",
+        "root": "appointments",
+        "key": "appointment_id",
+        "indexes": ["patient_id", "doctor_id", "status"],
+    },
+    "patient_queue": {
+        "file": DOCTOR_DIR / "patient_queue.json",
+        "root": "patients",
+        "key": "appointment_id",
+        "indexes": ["patient_id", "doctor_id", "status"],
+    },
+    "medical_records": {
+        "file": PATIENT_DIR / "medical_records.json",
+        "root": "records",
+        "key": "record_id",
+        "indexes": ["patient_id"],
+    },
+    "consultations": {
+        "file": DOCTOR_DIR / "consultations.json",
+        "root": "consultations",
+        "key": "consultation_id",
+        "indexes": ["patient_id"],
+    },
+    "jobs": {
+        "file": DATA_DIR / "jobs.json",
+        "root": "jobs",
+        "key": "job_id",
+        "indexes": ["status", "type"],
+    },
+}
+
+
+class StorageBackend:
+    """
+    Base interface for storage backends.
+
+    Every method takes a collection name from COLLECTIONS. Records are plain dicts.
+    """
+
+    def load_all(self, collection: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def get(self, collection: str, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def find(self, collection: str, field: str, value: Any) -> List[Dict]:
+        raise NotImplementedError
+
+    def insert(self, collection: str, record: Dict) -> Dict:
+        raise NotImplementedError
+
+    def upsert(self, collection: str, record: Dict) -> Dict:
+        raise NotImplementedError
+
+    def update(self, collection: str, key: str, fields: Dict) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def delete(self, collection: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def replace_all(self, collection: str, records: List[Dict]):
+        raise NotImplementedError
+
+    def version(self, collection: str):
+        """Return a cheap marker that changes whenever the collection is written"""
+        raise NotImplementedError
+
+
+class JSONStorageBackend(StorageBackend):
+    """Stores each collection as a single JSON file (the original on-disk format)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def _read(self, collection: str) -> List[Dict]:
+        spec = COLLECTIONS[collection]
+        try:
+            if spec["file"].exists():
+                with open(spec["file"], 'r') as f:
+                    data = json.load(f)
+                    return data.get(spec["root"], [])
+            return []
+        except Exception as e:
+            logger.error(f"Error loading {collection}: {e}")
+            return []
+
+    def _write(self, collection: str, records: List[Dict]):
+        spec = COLLECTIONS[collection]
+        tmp_path = spec["file"].with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({spec["root"]: records}, f, indent=2)
+        os.replace(tmp_path, spec["file"])
+
+    def load_all(self, collection: str) -> List[Dict]:
+        return self._read(collection)
+
+    def get(self, collection: str, key: str) -> Optional[Dict]:
+        key_field = COLLECTIONS[collection]["key"]
+        for record in self._read(collection):
+            if record.get(key_field) == key:
+                return record
+        return None
+
+    def find(self, collection: str, field: str, value: Any) -> List[Dict]:
+        return [record for record in self._read(collection) if record.get(field) == value]
+
+    def insert(self, collection: str, record: Dict) -> Dict:
+        with self._lock:
+            records = self._read(collection)
+            records.append(record)
+            self._write(collection, records)
+            return record
+
+    def upsert(self, collection: str, record: Dict) -> Dict:
+        key_field = COLLECTIONS[collection]["key"]
+        with self._lock:
+            records = self._read(collection)
+            for i, existing in enumerate(records):
+                if existing.get(key_field) == record.get(key_field):
+                    records[i] = record
+                    break
+            else:
+                records.append(record)
+            self._write(collection, records)
+            return record
+
+    def update(self, collection: str, key: str, fields: Dict) -> Optional[Dict]:
+        key_field = COLLECTIONS[collection]["key"]
+        with self._lock:
+            records = self._read(collection)
+            for record in records:
+                if record.get(key_field) == key:
+                    record.update(fields)
+                    self._write(collection, records)
+                    return record
+            return None
+
+    def delete(self, collection: str, key: str) -> bool:
+        key_field = COLLECTIONS[collection]["key"]
+        with self._lock:
+            records = self._read(collection)
+            remaining = [record for record in records if record.get(key_field) != key]
+            if len(remaining) == len(records):
+                return False
+            self._write(collection, remaining)
+            return True
+
+    def replace_all(self, collection: str, records: List[Dict]):
+        with self._lock:
+            self._write(collection, records)
+
+    def version(self, collection: str):
+        try:
+            stat = COLLECTIONS[collection]["file"].stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Stores each collection in its own SQLite table (WAL mode).
+
+    The primary key and the indexed fields are real columns; the full record is
+    kept as JSON in the `data` column. Inserts and updates touch a single row.
+    A per-collection version counter is bumped in the same transaction as every
+    write so that in-memory caches can detect changes with one indexed read.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or Config.SQLITE_DB_PATH or DEFAULT_SQLITE_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS collection_versions ("
+            "collection TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+        )
+        for collection, spec in COLLECTIONS.items():
+            index_columns = "".join(f", {field} TEXT" for field in spec["indexes"])
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {collection} ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"id TEXT NOT NULL UNIQUE{index_columns}, data TEXT NOT NULL)"
+            )
+            for field in spec["indexes"]:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{collection}_{field} ON {collection} ({field})"
+                )
+            conn.execute(
+                "INSERT OR IGNORE INTO collection_versions (collection, version) VALUES (?, 0)",
+                (collection,)
+            )
+
+    def _write_row(self, conn: sqlite3.Connection, collection: str, record: Dict):
+        """Insert a record, or replace it in place (keeping its position) if the id exists"""
+        spec = COLLECTIONS[collection]
+        columns = ["id"] + spec["indexes"] + ["data"]
+        values = [record.get(spec["key"])]
+        values.extend(record.get(field) for field in spec["indexes"])
+        values.append(json.dumps(record))
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        conn.execute(
+            f"INSERT INTO {collection} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}",
+            values
+        )
+
+    def _bump_version(self, conn: sqlite3.Connection, collection: str):
+        conn.execute(
+            "UPDATE collection_versions SET version = version + 1 WHERE collection = ?",
+            (collection,)
+        )
+
+    def load_all(self, collection: str) -> List[Dict]:
+        rows = self._connection().execute(f"SELECT data FROM {collection} ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, collection: str, key: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            f"SELECT data FROM {collection} WHERE id = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, collection: str, field: str, value: Any) -> List[Dict]:
+        spec = COLLECTIONS[collection]
+        if field == spec["key"]:
+            record = self.get(collection, value)
+            return [record] if record else []
+        if field not in spec["indexes"]:
+            return [record for record in self.load_all(collection) if record.get(field) == value]
+        rows = self._connection().execute(
+            f"SELECT data FROM {collection} WHERE {field} = ? ORDER BY seq", (value,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def insert(self, collection: str, record: Dict) -> Dict:
+        return self.upsert(collection, record)
+
+    def upsert(self, collection: str, record: Dict) -> Dict:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_row(conn, collection, record)
+            self._bump_version(conn, collection)
+        return record
+
+    def update(self, collection: str, key: str, fields: Dict) -> Optional[Dict]:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            record.update(fields)
+            self._write_row(conn, collection, record)
+            self._bump_version(conn, collection)
+        return record
+
+    def delete(self, collection: str, key: str) -> bool:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute(f"DELETE FROM {collection} WHERE id = ?", (key,)).rowcount
+            if deleted:
+                self._bump_version(conn, collection)
+        return bool(deleted)
+
+    def replace_all(self, collection: str, records: List[Dict]):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DELETE FROM {collection}")
+            for record in records:
+                self._write_row(conn, collection, record)
+            self._bump_version(conn, collection)
+
+    def version(self, collection: str):
+        row = self._connection().execute(
+            "SELECT version FROM collection_versions WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+def migrate_json_to_sqlite(db_path: Optional[Path] = None) -> Dict[str, int]:
+    """
+    One-shot migration of every JSON collection into a SQLite database.
+
+    Existing rows with the same primary key are replaced, so the migration can be re-run.
+
+    Returns:
+        Dict mapping collection name to the number of records migrated
+    """
+    source = JSONStorageBackend()
+    target = SQLiteStorageBackend(db_path)
+    counts = {}
+    for collection, spec in COLLECTIONS.items():
+        records = [rec for rec in source.load_all(collection) if rec.get(spec["key"])]
+        conn = target._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for record in records:
+                target._write_row(conn, collection, record)
+            target._bump_version(conn, collection)
+        counts[collection] = len(records)
+        logger.info(f"Migrated {len(records)} {collection} records to {target.db_path}")
+    return counts
+
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """Return the process-wide storage backend selected by Config.STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if Config.STORAGE_BACKEND == "sqlite":
+                    _storage = SQLiteStorageBackend()
+                else:
+                    _storage = JSONStorageBackend()
+                logger.info(f"STATUS: {type(_storage).__name__} Initialized Successfully!")
+    return _storage
@@ -2,10 +2,12 @@
 Appointments API endpoints
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict
+import asyncio
 import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import sys
@@ -22,6 +24,16 @@ from models import (
     GetAppointmentsResponse
 )
 from services.patient_summary import PatientSummaryService
+from services.patient_context import PatientContext
+from services.appointment_repository import appointment_repository
+from adapters.azure_openai import PRIORITY_BACKGROUND, LLM_NOT_RESPONDING
+from services.prompt_budget import SUMMARY_PREFIX, enforce_message_budget, window_turns
+from services.job_queue import job_queue
+from services.slot_engine import slot_engine, SlotUnavailableError
+from services.patient_queue import patient_queue
+from services.change_bus import change_bus, RESYNC_EVENT
+from config.config import Config
+from utils import format_sse, parse_appointment_datetime
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
 
@@ -30,51 +42,10 @@ DATA_DIR = Path(__file__).parent.parent / "data"
 DOCTOR_DIR = DATA_DIR / "doctor"
 DOCTOR_DIR.mkdir(parents=True, exist_ok=True)
 
-APPOINTMENTS_FILE = DOCTOR_DIR / "appointments.json"
-PATIENT_QUEUE_FILE = DOCTOR_DIR / "patient_queue.json"
 PAST_APPOINTMENTS_FILE = DOCTOR_DIR / "past_appointments.json"
 
-
-def load_appointments():
-    """Load appointments from JSON file"""
-    try:
-        if APPOINTMENTS_FILE.exists():
-            with open(APPOINTMENTS_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('appointments', [])
-        return []
-    except Exception as e:
-        return []
-
-
-def save_appointments(appointments):
-    """Save appointments to JSON file"""
-    try:
-        with open(APPOINTMENTS_FILE, 'w') as f:
-            json.dump({"appointments": appointments}, f, indent=2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving appointments: {str(e)}")
-
-
-def load_patient_queue():
-    """Load patient queue from JSON file"""
-    try:
-        if PATIENT_QUEUE_FILE.exists():
-            with open(PATIENT_QUEUE_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('patients', [])
-        return []
-    except Exception as e:
-        return []
-
-
-def save_patient_queue(patients):
-    """Save patient queue to JSON file"""
-    try:
-        with open(PATIENT_QUEUE_FILE, 'w') as f:
-            json.dump({"patients": patients}, f, indent=2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving patient queue: {str(e)}")
+# Background job that generates notes and the queue entry for a new appointment
+APPOINTMENT_FOLLOWUP_JOB = "appointment_followup"
 
 
 def load_past_appointments():
@@ -89,12 +60,27 @@ def load_past_appointments():
         return []
 
 
-def generate_appointment_notes(symptoms: Optional[str], conversation_history: List[Dict], 
-                               pain_rating: Optional[str] = None) -> str:
+def fallback_appointment_notes(symptoms: Optional[str], pain_rating: Optional[str] = None) -> str:
+    """Templated 2-line appointment notes, used until (or instead of) the LLM notes"""
+    main_issue = symptoms or "General health concern"
+    if pain_rating:
+        return f"Patient consultation regarding: {main_issue[:100]}.\nPain rating: {pain_rating}/10."
+    return f"Patient consultation regarding: {main_issue[:100]}.\nAppointment scheduled for evaluation."
+
+
+async def generate_appointment_notes(symptoms: Optional[str], conversation_history: Optional[List[Dict]] = None, 
+                               pain_rating: Optional[str] = None, session_id: Optional[str] = None,
+                               context: Optional[PatientContext] = None) -> str:
     """
-    Generate concise 2-line appointment notes using LLM based on ENTIRE patient-triage conversation history
+    Generate concise 2-line appointment notes using LLM based on the patient-triage conversation history.
+    Long conversations send the newest turns verbatim and a rolling summary of the rest
+    (cached per triage session_id). Without an explicit conversation_history the
+    conversation is taken from the patient context.
     """
     try:
+        if conversation_history is None:
+            conversation_history = context.conversation_history(session_id) if context else []
+        
         from services.patient_summary import PatientSummaryService
         summary_service = PatientSummaryService()
         
@@ -102,14 +88,22 @@ def generate_appointment_notes(symptoms: Optional[str], conversation_history: Li
         full_conversation = ""
         if conversation_history and len(conversation_history) > 0:
             # Format the entire conversation in a readable way
-            conversation_parts = []
+            turns = []
             for msg in conversation_history:
                 msg_type = msg.get("type", "")
                 msg_content = msg.get("content", "")
                 if msg_type == "user":
-                    conversation_parts.append(f"Patient: {msg_content}")
+                    turns.append(("Patient", msg_content))
                 elif msg_type == "bot" or msg_type == "assistant":
-                    conversation_parts.append(f"Triage Agent: {msg_content}")
+                    turns.append(("Triage Agent", msg_content))
+            
+            # Keep the newest turns verbatim, summarize the rest
+            summary, recent_turns = window_turns(
+                turns, summary_key=f"notes:{session_id}" if session_id else None
+            )
+            conversation_parts = [f"{label}: {content}" for label, content in recent_turns]
+            if summary:
+                conversation_parts.insert(0, SUMMARY_PREFIX + summary + "\n")
             
             # Join all conversation parts
             full_conversation = "\n".join(conversation_parts)
@@ -147,10 +141,12 @@ Generate exactly 2 lines of appointment notes based on the entire conversation:"
         ]
         
         # Call LLM to generate notes
-        summary = summary_service.llm.get_response(messages, json_mode=False)
+        summary = await summary_service.llm.get_response(
+            enforce_message_budget(messages), json_mode=False, priority=PRIORITY_BACKGROUND
+        )
         
         # Clean up and ensure exactly 2 lines
-        if summary:
+        if summary and summary != LLM_NOT_RESPONDING:
             # Remove markdown formatting
             clean_summary = summary.replace('**', '').replace('*', '').replace('#', '').replace('`', '').strip()
             
@@ -183,61 +179,97 @@ Generate exactly 2 lines of appointment notes based on the entire conversation:"
                 return result
         else:
             # Fallback if LLM returns empty
-            main_issue = symptoms or "General health concern"
-            if pain_rating:
-                return f"Patient consultation regarding: {main_issue[:100]}.\nPain rating: {pain_rating}/10."
-            return f"Patient consultation regarding: {main_issue[:100]}.\nAppointment scheduled for evaluation."
+            return fallback_appointment_notes(symptoms, pain_rating)
         
     except Exception as e:
         import logging
         logging.error(f"Error generating appointment notes with LLM: {e}", exc_info=True)
         # Fallback to simple summary
-        main_issue = symptoms or "General health concern"
-        if pain_rating:
-            return f"Patient consultation regarding: {main_issue[:100]}.\nPain rating: {pain_rating}/10."
-        return f"Patient consultation regarding: {main_issue[:100]}.\nAppointment scheduled for evaluation."
+        return fallback_appointment_notes(symptoms, pain_rating)
+
+
+async def run_appointment_followup(payload: Dict) -> Dict:
+    """
+    Background job for a newly scheduled appointment: generate the AI notes from the
+    triage conversation, store them on the appointment and add the patient to the
+    doctor's queue. Safe to re-run (the queue entry is keyed by appointment_id).
+    """
+    appointment_id = payload["appointment_id"]
+    # Everything below reads the appointment and conversation through one context
+    context = PatientContext.for_appointment(appointment_id)
+    appointment = context.appointment()
+    if appointment is None:
+        # Cancelled or deleted before the job ran
+        return {"appointment_id": appointment_id, "skipped": True}
+    
+    # Generate AI-powered 2-line summary from entire conversation
+    appointment_notes = await generate_appointment_notes(
+        symptoms=appointment.get("symptoms"),
+        pain_rating=appointment.get("pain_rating"),
+        session_id=appointment.get("triage_session_id"),
+        context=context
+    )
+    
+    # Split the 2-line summary into a list for ai_summary field
+    ai_summary_lines = [line.strip() for line in appointment_notes.split('\n') if line.strip()]
+    updated = appointment_repository.update(appointment_id, reason=appointment_notes, ai_summary=ai_summary_lines)
+    if updated:
+        context.remember_appointment(updated)
+    
+    # Generate patient summary and add to patient queue
+    summary_service = PatientSummaryService()
+    patient_summary = summary_service.generate_patient_summary_for_queue(
+        patient_id=appointment["patient_id"],
+        patient_name=appointment["patient_name"],
+        doctor_id=appointment["doctor_id"],
+        appointment_id=appointment_id,
+        conversation_history=context.conversation_history(),
+        symptoms=appointment.get("symptoms"),
+        pain_rating=appointment.get("pain_rating"),
+        appointment_date=appointment["appointment_date"],
+        appointment_time=appointment["appointment_time"],
+        ai_summary=ai_summary_lines,  # Pass ai_summary directly
+        context=context
+    )
+    # Keep the appointment's current status (it may have changed before the job ran)
+    patient_summary["status"] = appointment.get("status", "scheduled")
+    patient_queue.upsert(patient_summary)
+    
+    return {"appointment_id": appointment_id, "notes": appointment_notes}
+
+
+job_queue.register(APPOINTMENT_FOLLOWUP_JOB, run_appointment_followup)
 
 
 @router.post("/schedule", response_model=ScheduleAppointmentResponse)
 async def schedule_appointment(request: ScheduleAppointmentRequest):
     """
-    Schedule a new appointment and add to patient queue
+    Schedule a new appointment.
+    
+    The appointment is saved immediately with templated notes; the AI notes and the
+    patient queue entry are produced by a background job (see GET /api/jobs/{job_id}).
     """
     try:
         import logging
         logger = logging.getLogger(__name__)
         logger.info(f"Received appointment request: patient_id={request.patient_id}, doctor_id={request.doctor_id}")
         
-        appointments = load_appointments()
+        start = parse_appointment_datetime(request.appointment_date, request.appointment_time)
+        if start is None:
+            raise HTTPException(status_code=400, detail="Invalid appointment date or time")
         
-        # Get conversation history to generate appointment notes
-        conversation_history = []
-        if request.triage_session_id:
-            from services.triage_agent import TriageAgent
-            triage_agent = TriageAgent()
-            try:
-                session_data = triage_agent.get_conversation(request.triage_session_id)
-                if session_data:
-                    conversation_history = [
-                        {"type": msg.get("type"), "content": msg.get("content")}
-                        for msg in session_data.get("messages", [])
-                    ]
-            except Exception as e:
-                import logging
-                logging.warning(f"Could not load conversation history: {e}")
-        
-        # Generate AI-powered 2-line summary from entire conversation
-        appointment_notes = generate_appointment_notes(
-            symptoms=request.symptoms,
-            conversation_history=conversation_history,
-            pain_rating=request.pain_rating
-        )
+        # Reserve the slot first so concurrent bookings of the same time can't both succeed
+        appointment_id = str(uuid.uuid4())
+        try:
+            slot_engine.reserve(request.doctor_id, start, appointment_id)
+        except SlotUnavailableError:
+            raise HTTPException(status_code=409, detail="Time slot is no longer available")
         
-        # Split the 2-line summary into a list for ai_summary field
+        # Templated notes until the background job replaces them with the AI summary
+        appointment_notes = fallback_appointment_notes(request.symptoms, request.pain_rating)
         ai_summary_lines = [line.strip() for line in appointment_notes.split('\n') if line.strip()]
         
         # Create new appointment
-        appointment_id = str(uuid.uuid4())
         appointment = AppointmentResponse(
             appointment_id=appointment_id,
             patient_id=request.patient_id,
@@ -256,48 +288,31 @@ async def schedule_appointment(request: ScheduleAppointmentRequest):
             ai_summary=ai_summary_lines  # Also store as list for frontend display
         )
         
-        # Add to list
-        appointments.append(appointment.dict())
-        
-        # Save to file
-        save_appointments(appointments)
+        # Save to the appointment repository
+        try:
+            appointment_repository.add(appointment.dict())
+        except Exception as e:
+            slot_engine.release(appointment_id)
+            raise HTTPException(status_code=500, detail=f"Error saving appointments: {str(e)}")
+        slot_engine.confirm(appointment_id)
         
-        # Generate patient summary and add to patient queue
+        # Notes and patient queue entry are generated in the background
+        job_id = None
         try:
-            patient_queue = load_patient_queue()
-            summary_service = PatientSummaryService()
-            
-            # Use conversation_history already loaded above
-            
-            # Generate patient summary - pass ai_summary directly to avoid race condition
-            patient_summary = summary_service.generate_patient_summary_for_queue(
-                patient_id=request.patient_id,
-                patient_name=request.patient_name,
-                doctor_id=request.doctor_id,
-                appointment_id=appointment_id,
-                conversation_history=conversation_history,
-                symptoms=request.symptoms,
-                pain_rating=request.pain_rating,
-                appointment_date=request.appointment_date,
-                appointment_time=request.appointment_time,
-                ai_summary=ai_summary_lines  # Pass ai_summary directly
-            )
-            
-            # Add to patient queue
-            patient_queue.append(patient_summary)
-            save_patient_queue(patient_queue)
-            
+            job_id = job_queue.enqueue(APPOINTMENT_FOLLOWUP_JOB, {"appointment_id": appointment_id})["job_id"]
         except Exception as e:
             # Log error but don't fail the appointment scheduling
-            import logging
-            logging.warning(f"Error generating patient summary for queue: {e}")
+            logger.warning(f"Error queueing appointment follow-up job: {e}")
         
         return ScheduleAppointmentResponse(
             success=True,
             message="Appointment scheduled successfully",
-            appointment=appointment
+            appointment=appointment,
+            job_id=job_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error scheduling appointment: {str(e)}")
 
@@ -308,10 +323,8 @@ async def get_patient_appointments(patient_id: str):
     Get all appointments for a patient
     """
     try:
-        appointments = load_appointments()
         patient_appointments = [
-            AppointmentResponse(**apt) for apt in appointments
-            if apt.get('patient_id') == patient_id
+            AppointmentResponse(**apt) for apt in appointment_repository.for_patient(patient_id)
         ]
         
         # Sort by date (most recent first)
@@ -331,10 +344,8 @@ async def get_doctor_appointments(doctor_id: str):
     Get all appointments for a doctor
     """
     try:
-        appointments = load_appointments()
         doctor_appointments = [
-            AppointmentResponse(**apt) for apt in appointments
-            if apt.get('doctor_id') == doctor_id
+            AppointmentResponse(**apt) for apt in appointment_repository.for_doctor(doctor_id)
         ]
         
         # Sort by date (most recent first)
@@ -348,39 +359,97 @@ async def get_doctor_appointments(doctor_id: str):
         raise HTTPException(status_code=500, detail=f"Error retrieving appointments: {str(e)}")
 
 
-@router.get("/queue/doctor/{doctor_id}")
-async def get_doctor_patient_queue(doctor_id: str):
+@router.get("/doctors/{doctor_id}/availability")
+async def get_doctor_availability(doctor_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None):
     """
-    Get patient queue for a doctor from patient_queue.json
+    Get a doctor's offered slots with current availability, optionally limited to
+    start_date..end_date (inclusive, YYYY-MM-DD)
     """
     try:
-        patient_queue = load_patient_queue()
-        doctor_queue = [
-            patient for patient in patient_queue
-            if patient.get('doctor_id') == doctor_id
-        ]
-        
-        # Sort by appointment date and time (earliest first)
-        doctor_queue.sort(key=lambda x: (x.get('appointment_date', ''), x.get('appointment_time', '')), reverse=False)
+        start = parse_appointment_datetime(start_date, "00:00") if start_date else None
+        end = parse_appointment_datetime(end_date, "00:00") if end_date else None
+        if (start_date and start is None) or (end_date and end is None):
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        if end is not None:
+            end += timedelta(days=1)
         
         return {
             "success": True,
-            "patients": doctor_queue
+            "doctor_id": doctor_id,
+            "slots": slot_engine.slots_for_doctor(doctor_id, start, end)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving availability: {str(e)}")
+
+
+@router.get("/queue/doctor/{doctor_id}")
+async def get_doctor_patient_queue(doctor_id: str, limit: Optional[int] = None):
+    """
+    Get a doctor's waiting patients in queue order (earliest appointment first),
+    optionally only the next `limit` patients
+    """
+    try:
+        return {
+            "success": True,
+            "patients": patient_queue.for_doctor(doctor_id, limit)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving patient queue: {str(e)}")
 
 
+@router.get("/queue/doctor/{doctor_id}/events")
+async def stream_doctor_patient_queue(doctor_id: str):
+    """
+    Live updates for a doctor's dashboard as Server-Sent Events.
+    
+    Starts with a `snapshot` event (queue and appointments), then pushes
+    `patient_added` / `patient_updated` / `patient_removed` and
+    `appointment_scheduled` / `appointment_updated` events as they happen.
+    A `resync` event means updates were dropped and the client should reload.
+    """
+    def snapshot() -> str:
+        return format_sse("snapshot", {
+            "patients": patient_queue.for_doctor(doctor_id),
+            "appointments": appointment_repository.for_doctor(doctor_id)
+        })
+    
+    async def event_stream():
+        # Subscribe before taking the snapshot so no change falls in between
+        updates = change_bus.subscribe(doctor_id)
+        try:
+            yield snapshot()
+            while True:
+                try:
+                    message = await asyncio.wait_for(updates.get(), timeout=Config.QUEUE_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message["event"] == RESYNC_EVENT:
+                    yield format_sse(RESYNC_EVENT, {})
+                    yield snapshot()
+                else:
+                    yield format_sse(message["event"], message["data"])
+        finally:
+            change_bus.unsubscribe(doctor_id, updates)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(appointment_id: str):
     """
     Get a specific appointment by ID
     """
     try:
-        appointments = load_appointments()
-        for apt in appointments:
-            if apt.get('appointment_id') == appointment_id:
-                return AppointmentResponse(**apt)
+        apt = appointment_repository.get(appointment_id)
+        if apt:
+            return AppointmentResponse(**apt)
         
         raise HTTPException(status_code=404, detail="Appointment not found")
     except HTTPException:
@@ -415,10 +484,9 @@ async def get_patient_past_appointments(patient_id: str):
                     continue
         
         # Also check regular appointments for completed ones
-        appointments = load_appointments()
         completed_appointments = []
-        for apt in appointments:
-            if apt.get('patient_id') == patient_id and apt.get('status') == 'completed':
+        for apt in appointment_repository.for_patient(patient_id):
+            if apt.get('status') == 'completed':
                 apt_dict = dict(apt)
                 if 'diagnosis' not in apt_dict:
                     apt_dict['diagnosis'] = None
@@ -449,13 +517,37 @@ async def update_appointment_status(appointment_id: str, status: str):
     Update appointment status (scheduled, completed, cancelled)
     """
     try:
-        appointments = load_appointments()
-        for apt in appointments:
-            if apt.get('appointment_id') == appointment_id:
-                apt['status'] = status
-                save_appointments(appointments)
-                return {"success": True, "message": "Appointment status updated"}
+        appointment = appointment_repository.get(appointment_id)
+        if not appointment:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        
+        # Cancelling frees the slot; re-scheduling a cancelled appointment takes it again
+        reserved = False
+        if status == "cancelled":
+            slot_engine.release(appointment_id)
+        elif appointment.get("status") == "cancelled":
+            start = parse_appointment_datetime(appointment.get("appointment_date"), appointment.get("appointment_time"))
+            if start is not None:
+                try:
+                    slot_engine.reserve(appointment.get("doctor_id"), start, appointment_id)
+                except SlotUnavailableError:
+                    raise HTTPException(status_code=409, detail="Time slot is no longer available")
+                reserved = True
+        
+        try:
+            updated = appointment_repository.update(appointment_id, status=status)
+        except Exception:
+            if reserved:
+                slot_engine.release(appointment_id)
+            raise
+        if updated:
+            slot_engine.confirm(appointment_id)
+            patient_queue.update_status(appointment_id, status)
+            return {"success": True, "message": "Appointment status updated"}
         
+        # The appointment went away meanwhile; don't keep its slot blocked
+        if reserved:
+            slot_engine.release(appointment_id)
         raise HTTPException(status_code=404, detail="Appointment not found")
     except HTTPException:
         raise
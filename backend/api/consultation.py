@@ -6,29 +6,36 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import json
+import asyncio
+import hashlib
 from pathlib import Path
 from datetime import datetime
 import os
-import tempfile
 
 import sys
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from adapters.azure_openai import AzureOpenAIHelper
-from adapters.speech_to_text import AzureSpeechHelper
+from adapters.azure_openai import get_llm, PRIORITY_BACKGROUND, LLM_NOT_RESPONDING
 from adapters.logger import logger
+from adapters.storage import get_storage
+from config.config import Config
+from services.job_queue import consultation_queue, report_progress
+from services.transcription import transcribe_recording
+from services.audio_normalizer import normalize_recording
 
 router = APIRouter(prefix="/api/consultation", tags=["consultation"])
 
 # Path to data files
 DATA_DIR = Path(__file__).parent.parent / "data" / "doctor"
-CONSULTATIONS_FILE = DATA_DIR / "consultations.json"
 RECORDINGS_DIR = DATA_DIR / "recordings"
 
 # Ensure recordings directory exists
 RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Background job that transcribes a recording and extracts its KPIs
+CONSULTATION_PROCESSING_JOB = "consultation_processing"
+
 
 class Medication(BaseModel):
     name: str
@@ -72,32 +79,18 @@ class SaveConsultationRequest(BaseModel):
 
 
 def load_consultations() -> List[Dict]:
-    """Load consultations from JSON file"""
+    """Load consultations from the storage backend"""
     try:
-        if CONSULTATIONS_FILE.exists():
-            with open(CONSULTATIONS_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('consultations', [])
-        return []
+        return get_storage().load_all("consultations")
     except Exception as e:
         logger.error(f"Error loading consultations: {e}")
         return []
 
 
-def save_consultations(consultations: List[Dict]):
-    """Save consultations to JSON file"""
-    try:
-        with open(CONSULTATIONS_FILE, 'w') as f:
-            json.dump({"consultations": consultations}, f, indent=2)
-    except Exception as e:
-        logger.error(f"Error saving consultations: {e}")
-        raise HTTPException(status_code=500, detail="Failed to save consultation")
-
-
-def extract_kpis_from_transcript(transcript: str, patient_name: str, chief_complaint: str = "") -> Dict:
+async def extract_kpis_from_transcript(transcript: str, patient_name: str, chief_complaint: str = "") -> Dict:
     """Use LLM to extract KPIs from the consultation transcript"""
     try:
-        llm = AzureOpenAIHelper()
+        llm = get_llm()
         
         prompt = f"""Analyze this doctor-patient consultation transcript and extract the following information in JSON format.
 
@@ -121,9 +114,9 @@ If the transcript is empty or unclear, provide reasonable defaults based on the
             {"role": "user", "content": prompt}
         ]
         
-        response = llm.get_response(messages, json_mode=True)
+        response = await llm.get_response(messages, json_mode=True, priority=PRIORITY_BACKGROUND)
         
-        if response and response != "Azure OpenAI Not Responding":
+        if response and response != LLM_NOT_RESPONDING:
             try:
                 return json.loads(response)
             except json.JSONDecodeError:
@@ -147,7 +140,86 @@ def get_default_analysis(patient_name: str, chief_complaint: str) -> Dict:
     }
 
 
-@router.post("/process-recording")
+async def save_upload(upload: UploadFile, path: Path,
+                      max_bytes: int = Config.RECORDING_MAX_UPLOAD_BYTES,
+                      chunk_size: int = Config.RECORDING_UPLOAD_CHUNK_BYTES) -> Dict:
+    """
+    Stream an uploaded file to path in fixed-size chunks, hashing it on the way.
+    
+    Memory use stays at one chunk regardless of the file size. The file is written
+    next to path and renamed into place when complete; uploads over max_bytes are
+    discarded with a 413.
+    """
+    partial_path = path.with_name(path.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(partial_path, 'wb') as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Recording exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        os.replace(partial_path, path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    finally:
+        await upload.close()
+    
+    return {"path": path, "size": size, "sha256": digest.hexdigest()}
+
+
+async def run_consultation_processing(payload: Dict) -> Dict:
+    """
+    Job handler: transcribe a saved recording, store the transcript and extract KPIs.
+    Re-running it for the same consultation overwrites the transcript file.
+    """
+    consultation_id = payload["consultation_id"]
+    
+    # Transcribe a 16 kHz mono PCM copy of the recording unless the client sent one
+    transcription_path = str(RECORDINGS_DIR / payload["transcription_file"])
+    if payload["transcription_file"] == payload["audio_file"]:
+        report_progress({"stage": "normalizing"})
+        normalized_path = await normalize_recording(transcription_path, str(RECORDINGS_DIR / f"{consultation_id}_pcm.wav"))
+        transcription_path = normalized_path or transcription_path
+    
+    report_progress({"stage": "transcribing"})
+    transcription = await transcribe_recording(transcription_path)
+    transcript = transcription["transcript"]
+    
+    logger.info(f"Transcription completed: {transcript[:100]}..." if transcript else "No transcription")
+    
+    # Save transcript to file
+    transcript_path = RECORDINGS_DIR / f"{consultation_id}.txt"
+    with open(transcript_path, "w", encoding="utf-8") as f:
+        f.write(transcript)
+    logger.info(f"Transcript saved to {transcript_path}")
+    
+    # Extract KPIs using LLM
+    report_progress({"stage": "analyzing"})
+    ai_analysis = await extract_kpis_from_transcript(transcript, payload["patient_name"], payload.get("chief_complaint", ""))
+    
+    return {
+        "consultation_id": consultation_id,
+        "transcript": transcript,
+        "segments": transcription["segments"],
+        "ai_analysis": ai_analysis,
+        "audio_file": payload["audio_file"]
+    }
+
+
+consultation_queue.register(CONSULTATION_PROCESSING_JOB, run_consultation_processing)
+
+
+@router.post("/process-recording", status_code=202)
 async def process_recording(
     audio: UploadFile = File(...),
     audio_pcm: UploadFile = File(None),
@@ -157,9 +229,11 @@ async def process_recording(
     duration: str = Form("00:00")
 ):
     """
-    Process an audio recording: transcribe and extract KPIs using LLM.
-    Saves the recording persistently. 
-    If audio_pcm is provided, uses that for transcription (Azure Speech friendly format).
+    Accept an audio recording for processing.
+    Saves the recording persistently and queues transcription and KPI extraction;
+    follow the returned job via GET /api/jobs/{job_id} (or /events) for the result.
+    WAV recordings are converted to 16 kHz mono PCM on the server, so audio_pcm is
+    no longer needed; if a client still sends it, it is used for transcription as is.
     """
     try:
         # Generate consultation ID first
@@ -174,50 +248,44 @@ async def process_recording(
         filename = f"{consultation_id}.{file_ext}"
         audio_path = RECORDINGS_DIR / filename
         
-        with open(audio_path, 'wb') as f:
-            content = await audio.read()
-            f.write(content)
+        saved_audio = await save_upload(audio, audio_path)
         
-        logger.info(f"Recording file saved to {audio_path}")
+        logger.info(f"Recording file saved to {audio_path} ({saved_audio['size']} bytes, sha256 {saved_audio['sha256']})")
 
         # Handle transcription source
-        transcription_path = audio_path
+        transcription_filename = filename
         
         if audio_pcm:
             # Save the specific PCM audio for transcription
-            pcm_filename = f"{consultation_id}_pcm.wav"
-            pcm_path = RECORDINGS_DIR / pcm_filename
-            with open(pcm_path, 'wb') as f:
-                content = await audio_pcm.read()
-                f.write(content)
-            transcription_path = pcm_path
+            transcription_filename = f"{consultation_id}_pcm.wav"
+            pcm_path = RECORDINGS_DIR / transcription_filename
+            await save_upload(audio_pcm, pcm_path)
             logger.info(f"Using PCM audio for transcription: {pcm_path}")
         
-        # Transcribe the audio
-        speech_helper = AzureSpeechHelper()
-        transcript = speech_helper.transcribe_from_file(str(transcription_path))
-        
-        logger.info(f"Transcription completed: {transcript[:100]}..." if transcript else "No transcription")
-        
-        # Save transcript to file
-        transcript_filename = f"{consultation_id}.txt"
-        transcript_path = RECORDINGS_DIR / transcript_filename
-        with open(transcript_path, "w", encoding="utf-8") as f:
-            f.write(transcript)
-        logger.info(f"Transcript saved to {transcript_path}")
-        
-        # Extract KPIs using LLM
-        ai_analysis = extract_kpis_from_transcript(transcript, patient_name, chief_complaint)
+        # Transcription and KPI extraction run on the consultation workers
+        job = consultation_queue.enqueue(CONSULTATION_PROCESSING_JOB, {
+            "consultation_id": consultation_id,
+            "patient_id": patient_id,
+            "patient_name": patient_name,
+            "chief_complaint": chief_complaint,
+            "duration": duration,
+            "audio_file": filename,
+            "transcription_file": transcription_filename
+        })
         
-        return JSONResponse({
+        return JSONResponse(status_code=202, content={
             "success": True,
             "consultation_id": consultation_id,
-            "transcript": transcript,
-            "ai_analysis": ai_analysis,
+            "job_id": job["job_id"],
+            "status": job["status"],
             "audio_file": str(filename),
-            "message": "Recording processed successfully"
+            "audio_size": saved_audio["size"],
+            "audio_sha256": saved_audio["sha256"],
+            "message": "Recording accepted for processing"
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing recording: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -229,8 +297,6 @@ async def save_consultation(request: SaveConsultationRequest):
     Save a completed consultation to storage.
     """
     try:
-        consultations = load_consultations()
-        
         # Create consultation record
         consultation = {
             "consultation_id": request.consultation_id,
@@ -252,19 +318,12 @@ async def save_consultation(request: SaveConsultationRequest):
             }
         }
         
-        # Check if consultation already exists (update case)
-        existing_idx = None
-        for i, c in enumerate(consultations):
-            if c.get('consultation_id') == request.consultation_id:
-                existing_idx = i
-                break
-        
-        if existing_idx is not None:
-            consultations[existing_idx] = consultation
-        else:
-            consultations.append(consultation)
-        
-        save_consultations(consultations)
+        # Insert, or replace the existing consultation (update case)
+        try:
+            get_storage().upsert("consultations", consultation)
+        except Exception as e:
+            logger.error(f"Error saving consultation: {e}")
+            raise HTTPException(status_code=500, detail="Failed to save consultation")
         
         return JSONResponse({
             "success": True,
@@ -283,11 +342,9 @@ async def get_consultation(consultation_id: str):
     Get a specific consultation by ID.
     """
     try:
-        consultations = load_consultations()
-        
-        for consultation in consultations:
-            if consultation.get('consultation_id') == consultation_id:
-                return {"success": True, "consultation": consultation}
+        consultation = get_storage().get("consultations", consultation_id)
+        if consultation:
+            return {"success": True, "consultation": consultation}
         
         raise HTTPException(status_code=404, detail="Consultation not found")
         
@@ -2,7 +2,8 @@
 Doctor Portal AI Chatbot API
 Provides AI-powered chat functionality for doctors with context from patient queue
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import json
@@ -12,16 +13,16 @@ import sys
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from adapters.azure_openai import AzureOpenAIHelper
+from adapters.azure_openai import get_llm, PRIORITY_INTERACTIVE, LLM_NOT_RESPONDING
 from adapters.logger import logger
+from services.appointment_repository import appointment_repository
+from adapters.storage import get_storage
+from services.prompt_budget import enforce_message_budget, fit_blocks
+from config.config import Config
+from utils import format_sse, require_llm
 
 router = APIRouter(prefix="/api/doctor-chat", tags=["doctor-chat"])
 
-# Path to data files
-DATA_DIR = Path(__file__).parent.parent / "data" / "doctor"
-APPOINTMENTS_FILE = DATA_DIR / "appointments.json"
-PATIENT_QUEUE_FILE = DATA_DIR / "patient_queue.json"
-
 
 class DoctorChatRequest(BaseModel):
     message: str
@@ -35,17 +36,15 @@ class DoctorChatResponse(BaseModel):
     is_markdown: bool = True
 
 
+CHAT_ERROR_MESSAGE = "I apologize, but I'm having trouble processing your request. Please try again."
+
+
 def load_patient_queue(doctor_id: Optional[str] = None) -> List[Dict]:
     """Load patient queue data"""
     try:
-        if PATIENT_QUEUE_FILE.exists():
-            with open(PATIENT_QUEUE_FILE, 'r') as f:
-                data = json.load(f)
-                patients = data.get('patients', [])
-                if doctor_id:
-                    patients = [p for p in patients if p.get('doctor_id') == doctor_id]
-                return patients
-        return []
+        if doctor_id:
+            return get_storage().find("patient_queue", "doctor_id", doctor_id)
+        return get_storage().load_all("patient_queue")
     except Exception as e:
         logger.error(f"Error loading patient queue: {e}")
         return []
@@ -54,14 +53,9 @@ def load_patient_queue(doctor_id: Optional[str] = None) -> List[Dict]:
 def load_appointments(doctor_id: Optional[str] = None) -> List[Dict]:
     """Load appointments data"""
     try:
-        if APPOINTMENTS_FILE.exists():
-            with open(APPOINTMENTS_FILE, 'r') as f:
-                data = json.load(f)
-                appointments = data.get('appointments', [])
-                if doctor_id:
-                    appointments = [a for a in appointments if a.get('doctor_id') == doctor_id]
-                return appointments
-        return []
+        if doctor_id:
+            return appointment_repository.for_doctor(doctor_id)
+        return appointment_repository.all()
     except Exception as e:
         logger.error(f"Error loading appointments: {e}")
         return []
@@ -81,6 +75,7 @@ def build_context(doctor_id: Optional[str] = None, doctor_name: Optional[str] =
     # Add patient queue info
     if patients:
         context_parts.append(f"\n**Current Patient Queue ({len(patients)} patients):**")
+        patient_blocks = []
         for i, patient in enumerate(patients, 1):
             patient_info = f"""
 {i}. **{patient.get('patient_name', 'Unknown')}**
@@ -91,7 +86,13 @@ def build_context(doctor_id: Optional[str] = None, doctor_name: Optional[str] =
    - Symptoms: {patient.get('symptoms', 'N/A')}
    - Pain Rating: {patient.get('pain_rating', 'N/A')}/10
    - Summary: {patient.get('summary', 'N/A')}"""
-            context_parts.append(patient_info)
+            patient_blocks.append(patient_info)
+        
+        # Keep the queue within the context budget; the header still reports the full count
+        kept_blocks, omitted = fit_blocks(patient_blocks, Config.LLM_CONTEXT_TOKEN_BUDGET)
+        context_parts.extend(kept_blocks)
+        if omitted:
+            context_parts.append(f"\n...and {omitted} more patients not shown.")
     else:
         context_parts.append("\n**Current Patient Queue:** No patients in queue.")
     
@@ -107,20 +108,13 @@ def build_context(doctor_id: Optional[str] = None, doctor_name: Optional[str] =
     return "\n".join(context_parts)
 
 
-@router.post("/chat", response_model=DoctorChatResponse)
-async def doctor_chat(request: DoctorChatRequest):
-    """
-    AI-powered chat endpoint for doctors.
-    Provides answers based on patient queue context and general medical knowledge.
-    """
-    try:
-        llm = AzureOpenAIHelper()
-        
-        # Build context from patient queue and appointments
-        context = build_context(request.doctor_id, request.doctor_name)
-        
-        # Create system prompt
-        system_prompt = f"""You are an AI medical assistant helping a doctor in their practice. You have access to the current patient queue and appointment information.
+def build_chat_messages(request: DoctorChatRequest) -> List[Dict]:
+    """Build the LLM messages (system prompt with queue context + doctor question)"""
+    # Build context from patient queue and appointments
+    context = build_context(request.doctor_id, request.doctor_name)
+    
+    # Create system prompt
+    system_prompt = f"""You are an AI medical assistant helping a doctor in their practice. You have access to the current patient queue and appointment information.
 
 **Your Capabilities:**
 1. Answer questions about patients in the queue (their symptoms, triage level, appointment times)
@@ -142,18 +136,29 @@ async def doctor_chat(request: DoctorChatRequest):
 - Always maintain a professional, clinical tone
 - For clinical questions, consider providing differential diagnoses, relevant tests, and management options"""
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": request.message}
-        ]
+    return enforce_message_budget([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": request.message}
+    ])
+
+
+@router.post("/chat", response_model=DoctorChatResponse, dependencies=[Depends(require_llm)])
+async def doctor_chat(request: DoctorChatRequest):
+    """
+    AI-powered chat endpoint for doctors.
+    Provides answers based on patient queue context and general medical knowledge.
+    """
+    try:
+        llm = get_llm()
+        messages = build_chat_messages(request)
         
         # Get response from LLM
-        response = llm.get_response(messages, json_mode=False)
+        response = await llm.get_response(messages, json_mode=False, priority=PRIORITY_INTERACTIVE)
         
-        if not response or response == "Azure OpenAI Not Responding":
+        if not response or response == LLM_NOT_RESPONDING:
             return DoctorChatResponse(
                 success=False,
-                response="I apologize, but I'm having trouble processing your request. Please try again.",
+                response=CHAT_ERROR_MESSAGE,
                 is_markdown=False
             )
         
@@ -168,6 +173,52 @@ async def doctor_chat(request: DoctorChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+@router.post("/chat/stream", dependencies=[Depends(require_llm)])
+async def doctor_chat_stream(request: DoctorChatRequest):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+
+    Emits `token` events ({"content": "..."}) as the answer is generated, followed by
+    a single `done` event ({"success": bool, "is_markdown": bool, "response"?: str,
+    "error"?: str}). `success` is false when the answer was cut off by an upstream error.
+    """
+    try:
+        llm = get_llm()
+        messages = build_chat_messages(request)
+    except Exception as e:
+        logger.error(f"Error in doctor chat: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+
+    async def event_stream():
+        received = False
+        error = None
+        try:
+            async for token in llm.stream_chat_response(messages, priority=PRIORITY_INTERACTIVE):
+                received = True
+                yield format_sse("token", {"content": token})
+        except Exception as e:
+            logger.error(f"Error streaming doctor chat: {e}", exc_info=True)
+            error = str(e) or type(e).__name__
+        
+        if received and error is None:
+            yield format_sse("done", {"success": True, "is_markdown": True})
+        else:
+            done = {
+                "success": False,
+                "is_markdown": False,
+                "response": CHAT_ERROR_MESSAGE
+            }
+            if error is not None:
+                done["error"] = error
+            yield format_sse("done", done)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/context/{doctor_id}")
 async def get_doctor_context(doctor_id: str):
     """
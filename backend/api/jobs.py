@@ -0,0 +1,79 @@
+"""
+Background job status API (polling and Server-Sent Events)
+"""
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from models import JobStatus, JobStatusResponse
+from config.config import Config
+from services.change_bus import change_bus, RESYNC_EVENT
+from services.job_queue import JOB_FAILED, JOB_SUCCEEDED, job_queue, job_topic
+from utils import format_sse
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the status (and result, once finished) of a background job
+    """
+    try:
+        job = job_queue.get(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading job: {str(e)}")
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatusResponse(success=True, job=JobStatus(**job))
+
+
+@router.get("/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """
+    Job status updates as Server-Sent Events: a `job` event with the current state,
+    then one per change (progress, retries) until the job succeeds or fails
+    """
+    topic = job_topic(job_id)
+    updates = change_bus.subscribe(topic)
+    try:
+        job = job_queue.get(job_id)
+    except Exception as e:
+        change_bus.unsubscribe(topic, updates)
+        raise HTTPException(status_code=500, detail=f"Error loading job: {str(e)}")
+    if not job:
+        change_bus.unsubscribe(topic, updates)
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        current = job
+        try:
+            while True:
+                yield format_sse("job", JobStatus(**current).dict())
+                if current["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+                    return
+                try:
+                    message = await asyncio.wait_for(updates.get(), timeout=Config.QUEUE_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # After a resync the stored job is the latest state
+                current = message["data"] if message["event"] != RESYNC_EVENT else (job_queue.get(job_id) or current)
+        finally:
+            change_bus.unsubscribe(topic, updates)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
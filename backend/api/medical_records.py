@@ -3,10 +3,8 @@ Medical Records API endpoints
 """
 from fastapi import APIRouter, HTTPException
 from typing import Optional, List
-import json
 import uuid
 from datetime import datetime
-from pathlib import Path
 
 import sys
 from pathlib import Path as PathLib
@@ -20,37 +18,10 @@ from models import (
     MedicalRecordResponse,
     GetMedicalRecordsResponse
 )
+from adapters.storage import get_storage
 
 router = APIRouter(prefix="/api/medical-records", tags=["medical-records"])
 
-# Path to medical records JSON file - stored in patient folder
-DATA_DIR = Path(__file__).parent.parent / "data"
-PATIENT_DIR = DATA_DIR / "patient"
-PATIENT_DIR.mkdir(parents=True, exist_ok=True)
-
-MEDICAL_RECORDS_FILE = PATIENT_DIR / "medical_records.json"
-
-
-def load_medical_records():
-    """Load medical records from JSON file"""
-    try:
-        if MEDICAL_RECORDS_FILE.exists():
-            with open(MEDICAL_RECORDS_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('records', [])
-        return []
-    except Exception as e:
-        return []
-
-
-def save_medical_records(records):
-    """Save medical records to JSON file"""
-    try:
-        with open(MEDICAL_RECORDS_FILE, 'w') as f:
-            json.dump({"records": records}, f, indent=2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving medical records: {str(e)}")
-
 
 @router.post("/", response_model=MedicalRecordResponse)
 async def create_medical_record(request: MedicalRecordRequest):
@@ -58,8 +29,6 @@ async def create_medical_record(request: MedicalRecordRequest):
     Create a new medical record
     """
     try:
-        records = load_medical_records()
-        
         # Create new record
         record_id = str(uuid.uuid4())
         record = MedicalRecordResponse(
@@ -75,11 +44,11 @@ async def create_medical_record(request: MedicalRecordRequest):
             created_at=datetime.now().isoformat()
         )
         
-        # Add to list
-        records.append(record.dict())
-        
-        # Save to file
-        save_medical_records(records)
+        # Save to storage
+        try:
+            get_storage().insert("medical_records", record.dict())
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error saving medical records: {str(e)}")
         
         return record
         
@@ -93,10 +62,9 @@ async def get_patient_records(patient_id: str):
     Get all medical records for a patient
     """
     try:
-        records = load_medical_records()
         patient_records = [
-            MedicalRecordResponse(**rec) for rec in records
-            if rec.get('patient_id') == patient_id
+            MedicalRecordResponse(**rec)
+            for rec in get_storage().find("medical_records", "patient_id", patient_id)
         ]
         
         # Sort by date (most recent first)
@@ -116,10 +84,9 @@ async def get_medical_record(record_id: str):
     Get a specific medical record by ID
     """
     try:
-        records = load_medical_records()
-        for rec in records:
-            if rec.get('record_id') == record_id:
-                return MedicalRecordResponse(**rec)
+        rec = get_storage().get("medical_records", record_id)
+        if rec:
+            return MedicalRecordResponse(**rec)
         
         raise HTTPException(status_code=404, detail="Medical record not found")
     except HTTPException:
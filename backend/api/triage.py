@@ -2,7 +2,8 @@
 Triage API endpoints
 """
 from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Dict
 
 import sys
 from pathlib import Path
@@ -22,6 +23,9 @@ from models import (
     UserSessionsResponse
 )
 from services.triage_agent import TriageAgent
+from services.patient_context import PatientContext
+from services.session_index import session_index
+from utils import format_sse, require_llm
 
 router = APIRouter(prefix="/api/triage", tags=["triage"])
 
@@ -37,7 +41,7 @@ async def start_triage_session(request: StartSessionRequest):
     """
     try:
         session_id = triage_agent.start_session(request.user_id)
-        conversation = triage_agent.get_conversation(session_id)
+        conversation = triage_agent.get_conversation(session_id, PatientContext.for_triage_session(session_id))
         
         if not conversation:
             raise HTTPException(status_code=500, detail="Failed to create session")
@@ -54,73 +58,71 @@ async def start_triage_session(request: StartSessionRequest):
         raise HTTPException(status_code=500, detail=f"Error starting session: {str(e)}")
 
 
+def record_turn(session_id: str, user_message: str, result: Dict):
+    """Save the user message and the agent's reply to the conversation"""
+    response_data = result.get("response", {})
+    collected_info = result.get("collected_info", {})
+    recommended_doctor = response_data.get("recommended_doctor")
+    
+    # Save user message
+    triage_agent.add_message(
+        session_id,
+        "user",
+        user_message
+    )
+    
+    # Save bot response
+    bot_metadata = {
+        "question_type": response_data.get("question_type"),
+        "collected_info": collected_info,
+        "is_complete": response_data.get("is_complete", False)
+    }
+    
+    if recommended_doctor:
+        bot_metadata["recommended_doctor"] = recommended_doctor
+    
+    triage_agent.add_message(
+        session_id,
+        "bot",
+        response_data.get("message", ""),
+        bot_metadata
+    )
+
+
 @router.post("/message", response_model=SendMessageResponse)
 async def send_message(request: SendMessageRequest):
     """
     Send a message to the triage agent
     """
     try:
-        # Load conversation history
-        conversation = triage_agent.get_conversation(request.session_id)
+        # The conversation is loaded once and shared through the request's context
+        context = PatientContext.for_triage_session(request.session_id)
+        conversation = triage_agent.get_conversation(request.session_id, context)
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Build conversation history for agent
-        conversation_history = []
-        for msg in conversation.get("messages", []):
-            conversation_history.append({
-                "type": msg.get("type"),
-                "content": msg.get("content")
-            })
-        
-        # Get current collected info
-        current_collected_info = conversation.get("collected_info", {})
+        if triage_agent.needs_llm(request.message, context.collected_info()):
+            require_llm()
         
         # Process message
-        result = triage_agent.process_message(
+        result = await triage_agent.process_message(
             request.session_id,
             request.message,
-            conversation_history,
-            current_collected_info
+            context.conversation_history(),
+            context.collected_info()
         )
         
         if not result.get("success"):
             raise HTTPException(status_code=500, detail=result.get("error", "Processing failed"))
         
-        response_data = result.get("response", {})
-        collected_info = result.get("collected_info", {})
-        recommended_doctor = response_data.get("recommended_doctor")
-        
-        # Save user message
-        triage_agent.add_message(
-            request.session_id,
-            "user",
-            request.message
-        )
-        
-        # Save bot response
-        bot_metadata = {
-            "question_type": response_data.get("question_type"),
-            "collected_info": collected_info,
-            "is_complete": response_data.get("is_complete", False)
-        }
-        
-        if recommended_doctor:
-            bot_metadata["recommended_doctor"] = recommended_doctor
-        
-        triage_agent.add_message(
-            request.session_id,
-            "bot",
-            response_data.get("message", ""),
-            bot_metadata
-        )
+        record_turn(request.session_id, request.message, result)
         
+        response_data = result.get("response", {})
         return SendMessageResponse(
             success=True,
             response=response_data,
-            recommended_doctor=recommended_doctor,
-            collected_info=collected_info
+            recommended_doctor=response_data.get("recommended_doctor"),
+            collected_info=result.get("collected_info", {})
         )
         
     except HTTPException:
@@ -129,13 +131,66 @@ async def send_message(request: SendMessageRequest):
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
+@router.post("/message/stream")
+async def send_message_stream(request: SendMessageRequest):
+    """
+    Send a message to the triage agent and stream the reply as Server-Sent Events.
+    
+    Emits `delta` events ({"content": "..."}) with the agent's message text as it is
+    generated, then one `done` event with the same body as /message, or an `error`
+    event ({"detail": "..."}). The message in `done` is authoritative and may replace
+    the streamed text (e.g. with the doctor recommendation).
+    """
+    context = PatientContext.for_triage_session(request.session_id)
+    conversation = triage_agent.get_conversation(request.session_id, context)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if triage_agent.needs_llm(request.message, context.collected_info()):
+        require_llm()
+
+    async def event_stream():
+        try:
+            async for event in triage_agent.stream_message(
+                request.session_id,
+                request.message,
+                context.conversation_history(),
+                context.collected_info()
+            ):
+                if event["type"] == "delta":
+                    yield format_sse("delta", {"content": event["content"]})
+                    continue
+                
+                result = event["result"]
+                if not result.get("success"):
+                    yield format_sse("error", {"detail": result.get("error", "Processing failed")})
+                    return
+                
+                record_turn(request.session_id, request.message, result)
+                
+                response_data = result.get("response", {})
+                yield format_sse("done", {
+                    "success": True,
+                    "response": response_data,
+                    "recommended_doctor": response_data.get("recommended_doctor"),
+                    "collected_info": result.get("collected_info", {})
+                })
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Error processing message: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/conversation/{session_id}", response_model=ConversationResponse)
 async def get_conversation(session_id: str):
     """
     Get conversation history by session ID
     """
     try:
-        conversation = triage_agent.get_conversation(session_id)
+        conversation = triage_agent.get_conversation(session_id, PatientContext.for_triage_session(session_id))
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
@@ -173,57 +228,18 @@ async def get_user_sessions(user_id: Optional[str] = None):
     Returns session summaries with basic information
     """
     try:
-        sessions = triage_agent.get_all_sessions(user_id)
-        
-        session_summaries = []
-        for session in sessions:
-            # Extract symptom from collected info or first user message
-            symptom = None
-            collected_info = session.get("collected_info", {})
-            if collected_info.get("issue"):
-                symptom = collected_info["issue"]
-            else:
-                # Try to get from first user message
-                for msg in session.get("messages", []):
-                    if msg.get("type") == "user":
-                        symptom = msg.get("content", "")[:50] + "..." if len(msg.get("content", "")) > 50 else msg.get("content", "")
-                        break
-            
-            # Get triage level from last bot message
-            triage_level = None
-            recommended_doctor = None
-            for msg in reversed(session.get("messages", [])):
-                if msg.get("type") == "bot":
-                    metadata = msg.get("metadata", {})
-                    if metadata.get("recommended_doctor"):
-                        recommended_doctor = metadata["recommended_doctor"].get("name", "")
-                    # Check for triage level in metadata or infer from pain_rating
-                    collected_info_in_msg = metadata.get("collected_info", {})
-                    pain_rating = collected_info_in_msg.get("pain_rating")
-                    if pain_rating:
-                        try:
-                            rating = int(pain_rating)
-                            if rating <= 3:
-                                triage_level = "low"
-                            elif rating <= 6:
-                                triage_level = "medium"
-                            elif rating <= 8:
-                                triage_level = "high"
-                            else:
-                                triage_level = "high"  # 9-10 is critical/high
-                        except (ValueError, TypeError):
-                            # Fallback if not a number
-                            pass
-                    break
-            
-            session_summaries.append(SessionSummary(
-                session_id=session.get("session_id"),
-                created_at=session.get("created_at"),
-                status=session.get("status", "active"),
-                symptom=symptom,
-                triage_level=triage_level,
-                recommended_doctor=recommended_doctor
-            ))
+        # Summaries are materialized in the session manifest when messages are added
+        session_summaries = [
+            SessionSummary(
+                session_id=entry.get("session_id"),
+                created_at=entry.get("created_at"),
+                status=entry.get("status") or "active",
+                symptom=entry.get("symptom"),
+                triage_level=entry.get("triage_level"),
+                recommended_doctor=entry.get("recommended_doctor")
+            )
+            for entry in session_index.list_entries(user_id)
+        ]
         
         # Sort by created_at descending (most recent first)
         session_summaries.sort(key=lambda x: x.created_at, reverse=True)
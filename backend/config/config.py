@@ -7,11 +7,90 @@ class Config:
     AZURE_OPENAI_VERSION = "2024-12-01-preview"
     GPT_GENERATION_4O_MODEL = "gpt-4o"
     GPT_GENERATION_4O_MINI_MODEL = "gpt-4o-mini"
+    GPT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+    # Shared Azure OpenAI HTTP connection pool (one per process)
+    LLM_MAX_CONNECTIONS = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+    LLM_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+    LLM_CONNECT_TIMEOUT = 5.0
+    LLM_REQUEST_TIMEOUT = 60.0
+
+    # LLM scheduler: global concurrency cap and tokens-per-minute budget shared by all callers
+    LLM_MAX_CONCURRENCY = 16
+    LLM_TOKENS_PER_MINUTE = 100000  # Match the deployment's TPM quota; 0 disables rate limiting
+    LLM_COMPLETION_TOKEN_ESTIMATE = 500  # Reserved per call for the completion until real usage is known
+
+    # Per-call timeout, circuit breaker and hedged requests for LLM calls
+    LLM_CALL_TIMEOUT = 20.0  # seconds per attempt
+    LLM_BREAKER_WINDOW = 20  # recent calls considered
+    LLM_BREAKER_MIN_CALLS = 10
+    LLM_BREAKER_FAILURE_RATE = 0.5  # failed or slow share of the window that opens the circuit
+    LLM_BREAKER_SLOW_CALL_SECONDS = 15.0
+    LLM_BREAKER_OPEN_SECONDS = 30.0  # time before a half-open probe
+    LLM_HEDGING_ENABLED = False  # send a second attempt when the first is slower than the recent p95
+    LLM_HEDGE_MIN_SAMPLES = 20
+    LLM_HEDGE_MIN_DELAY = 0.5
+
+    # Prompt budget: long conversations keep the newest turns verbatim and fold older ones into a rolling summary
+    LLM_PROMPT_TOKEN_BUDGET = 6000  # hard cap per call
+    LLM_PROMPT_KEEP_TURNS = 8
+    LLM_PROMPT_SUMMARY_TOKENS = 400
+    LLM_CONTEXT_TOKEN_BUDGET = 3000  # patient queue / appointment context in the doctor chatbot
+
+    # Deterministic LLM response cache (temperature=0, fixed seed)
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_MAX_ENTRIES = 1024
+    LLM_CACHE_TTL_SECONDS = 6 * 60 * 60
+    LLM_CACHE_PERSIST_PATH = ""  # e.g. "data/llm_cache.db" to keep entries across restarts
 
 
     SPEECH_ENDPOINT='https://eastus2.api.cognitive.microsoft.com/'
     SPEECH_KEY=''
     SPEECH_REGION ='eastus2'
+
+
+    # Storage backend for appointments, patient queue, medical records and consultations
+    # "json" keeps the flat files under data/, "sqlite" uses a local WAL database
+    STORAGE_BACKEND = "json"
+    SQLITE_DB_PATH = ""  # Defaults to data/mediverse.db when empty
+
+    # Length of an appointment; bookings for the same doctor may not overlap
+    APPOINTMENT_SLOT_MINUTES = 30
+
+    # Doctor patient queue: minutes a patient moves up per triage level (medium 1x, high 2x); 0 = time order only
+    PATIENT_QUEUE_TRIAGE_WEIGHT_MINUTES = 0
+
+    # Live doctor dashboard updates: events buffered per subscriber before it must resync,
+    # and seconds between keep-alive comments on the event stream
+    CHANGE_BUS_MAX_PENDING = 100
+    QUEUE_STREAM_HEARTBEAT_SECONDS = 15
+
+    # Background job queue (appointment notes and patient queue entries)
+    JOB_WORKERS = 2
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_BASE_DELAY = 2.0  # seconds, doubled on every retry
+    JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60  # finished jobs are pruned after this long
+
+    # Consultation recording uploads are streamed to disk in chunks of this size
+    RECORDING_UPLOAD_CHUNK_BYTES = 1024 * 1024
+    RECORDING_MAX_UPLOAD_BYTES = 2 * 1024 * 1024 * 1024  # per file; larger uploads get 413
+
+    # Consultation transcription runs on its own thread pool; long PCM WAV recordings are
+    # split at silences (energy VAD) and the segments transcribed in parallel
+    STT_BACKEND = "azure"
+    TRANSCRIPTION_WORKERS = 4
+    TRANSCRIPTION_SEGMENT_SECONDS = 60  # longest segment sent to the STT backend
+    TRANSCRIPTION_MIN_SEGMENT_SECONDS = 15  # don't cut at silences before this
+    VAD_FRAME_MS = 30
+    VAD_MIN_SILENCE_MS = 300  # shortest pause that can be a cut point
+    VAD_THRESHOLD_DB = 12  # frames this far above the noise floor count as speech
+
+    # Uploaded WAV recordings are converted to mono 16-bit PCM at this rate for transcription
+    AUDIO_TARGET_SAMPLE_RATE = 16000
+    AUDIO_NORMALIZE_WORKERS = 2  # processes
+    TRANSCRIPTION_TIMEOUT = 2 * 60 * 60  # seconds to wait for a recording's recognition to finish
+    CONSULTATION_WORKERS = 2  # recordings processed (transcription + KPI extraction) in parallel
  
 
   
\ No newline at end of file
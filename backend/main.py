@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import json
 import os
 from pathlib import Path
@@ -14,8 +15,28 @@ from api.medical_records import router as medical_records_router
 from api.patient_summary import router as patient_summary_router
 from api.doctor_chatbot import router as doctor_chatbot_router
 from api.consultation import router as consultation_router
+from api.jobs import router as jobs_router
+from adapters.azure_openai import startup_llm_client, shutdown_llm_client, get_llm, llm_available
+from services.job_queue import job_queue, consultation_queue
+from adapters.speech_to_text import shutdown_transcription_pool
+from services.audio_normalizer import shutdown_normalize_pool
 
-app = FastAPI(title="MediVerse API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await startup_llm_client()
+    await job_queue.start()
+    await consultation_queue.start()
+    yield
+    await consultation_queue.stop()
+    await job_queue.stop()
+    await shutdown_llm_client()
+    shutdown_transcription_pool()
+    shutdown_normalize_pool()
+
+
+app = FastAPI(title="MediVerse API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -52,6 +73,13 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/llm")
+async def llm_health_check():
+    """LLM adapter counters (response cache hits/misses)"""
+    status = "healthy" if llm_available() else "unavailable"
+    return {"status": status, **get_llm().stats()}
+
+
 @app.post("/api/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     """
@@ -103,6 +131,7 @@ app.include_router(medical_records_router)
 app.include_router(patient_summary_router)
 app.include_router(doctor_chatbot_router)
 app.include_router(consultation_router)
+app.include_router(jobs_router)
 
 
 if __name__ == "__main__":
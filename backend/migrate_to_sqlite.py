@@ -0,0 +1,28 @@
+"""
+One-shot migration of the JSON data files into the SQLite storage backend.
+
+Usage:
+    python migrate_to_sqlite.py [--db data/mediverse.db]
+
+After migrating, set Config.STORAGE_BACKEND = "sqlite" to serve from the database.
+The migration is idempotent: records are upserted by their primary key.
+"""
+import argparse
+from pathlib import Path
+
+from adapters.storage import migrate_json_to_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate MediVerse JSON data files to SQLite")
+    parser.add_argument("--db", type=Path, default=None,
+                        help="Path to the SQLite database (defaults to Config.SQLITE_DB_PATH or data/mediverse.db)")
+    args = parser.parse_args()
+
+    counts = migrate_json_to_sqlite(args.db)
+    for collection, count in counts.items():
+        print(f"{collection}: {count} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -129,6 +129,7 @@ class ScheduleAppointmentResponse(BaseModel):
     success: bool
     message: str
     appointment: AppointmentResponse
+    job_id: Optional[str] = None  # Background job generating notes and the queue entry
 
 
 class GetAppointmentsResponse(BaseModel):
@@ -185,3 +186,23 @@ class PatientSummaryResponse(BaseModel):
     triage_sessions: List[SessionSummary]
     patient_profile: Optional[Dict] = None  # Age, gender, blood_group, appointment_time, chief_complaint
 
+
+
+# ==================== Background Job Models ====================
+
+class JobStatus(BaseModel):
+    job_id: str
+    type: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    max_attempts: int
+    progress: Optional[Dict] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+class JobStatusResponse(BaseModel):
+    success: bool
+    job: JobStatus
@@ -0,0 +1,162 @@
+"""
+Appointment Repository
+Keeps appointments in memory with hash indexes on appointment, patient and doctor ids.
+The storage backend is only re-read when the appointments collection changes.
+"""
+import threading
+from typing import Dict, List, Optional
+from pathlib import Path
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.logger import logger
+from adapters.storage import StorageBackend, get_storage
+from services.change_bus import change_bus
+
+COLLECTION = "appointments"
+
+
+class AppointmentRepository:
+    """
+    Indexed in-memory view of the appointments collection
+
+    Lookups by appointment_id, patient_id and doctor_id are dictionary hits.
+    The collection is reloaded only when the backend's version marker changes
+    (file mtime/size for JSON, a write counter for SQLite), so edits made by
+    another process are still picked up.
+    """
+
+    def __init__(self, storage: Optional[StorageBackend] = None):
+        self._storage = storage
+        self._lock = threading.RLock()
+        self._signature = None
+        self._generation = 0
+        self._appointments: List[Dict] = []
+        self._by_id: Dict[str, Dict] = {}
+        self._by_patient: Dict[str, List[Dict]] = {}
+        self._by_doctor: Dict[str, List[Dict]] = {}
+
+    @property
+    def storage(self) -> StorageBackend:
+        if self._storage is None:
+            self._storage = get_storage()
+        return self._storage
+
+    def _index(self, appointment: Dict):
+        """Add a single appointment to the hash indexes"""
+        appointment_id = appointment.get('appointment_id')
+        if appointment_id:
+            self._by_id[appointment_id] = appointment
+        self._by_patient.setdefault(appointment.get('patient_id'), []).append(appointment)
+        self._by_doctor.setdefault(appointment.get('doctor_id'), []).append(appointment)
+
+    def _rebuild(self, appointments: List[Dict]):
+        """Replace the in-memory state and rebuild all indexes"""
+        self._generation += 1
+        self._appointments = appointments
+        self._by_id = {}
+        self._by_patient = {}
+        self._by_doctor = {}
+        for apt in appointments:
+            self._index(apt)
+
+    def _refresh(self):
+        """Reload from storage if the collection changed since the last load"""
+        signature = self.storage.version(COLLECTION)
+        if signature == self._signature:
+            return
+        try:
+            appointments = self.storage.load_all(COLLECTION)
+        except Exception as e:
+            logger.error(f"Error loading appointments: {e}")
+            return
+        self._rebuild(appointments)
+        self._signature = signature
+
+    def _mark_written(self, previous_signature):
+        """
+        Adopt the backend's new version after our own write, unless someone else
+        wrote since our last load (in which case the next read reloads).
+        """
+        if self._signature == previous_signature:
+            self._signature = self.storage.version(COLLECTION)
+        else:
+            self._signature = None
+
+    def generation(self) -> int:
+        """
+        Counter bumped whenever the in-memory state is rebuilt (reload from storage,
+        replace_all); derived caches rebuild themselves when it changes.
+        Incremental add/update calls don't bump it.
+        """
+        with self._lock:
+            self._refresh()
+            return self._generation
+
+    def all(self) -> List[Dict]:
+        """Get all appointments"""
+        with self._lock:
+            self._refresh()
+            return [dict(apt) for apt in self._appointments]
+
+    def get(self, appointment_id: str) -> Optional[Dict]:
+        """Get a single appointment by ID"""
+        with self._lock:
+            self._refresh()
+            apt = self._by_id.get(appointment_id)
+            return dict(apt) if apt else None
+
+    def for_patient(self, patient_id: str) -> List[Dict]:
+        """Get all appointments for a patient"""
+        with self._lock:
+            self._refresh()
+            return [dict(apt) for apt in self._by_patient.get(patient_id, [])]
+
+    def for_doctor(self, doctor_id: str) -> List[Dict]:
+        """Get all appointments for a doctor"""
+        with self._lock:
+            self._refresh()
+            return [dict(apt) for apt in self._by_doctor.get(doctor_id, [])]
+
+    def add(self, appointment: Dict) -> Dict:
+        """Add a new appointment and persist it"""
+        with self._lock:
+            self._refresh()
+            previous = self.storage.version(COLLECTION)
+            record = dict(appointment)
+            self.storage.insert(COLLECTION, record)
+            self._appointments.append(record)
+            self._index(record)
+            self._mark_written(previous)
+            change_bus.publish(record.get('doctor_id'), "appointment_scheduled", {"appointment": dict(record)})
+            return dict(record)
+
+    def update(self, appointment_id: str, **fields) -> Optional[Dict]:
+        """Update fields on an appointment; returns None if it does not exist"""
+        with self._lock:
+            self._refresh()
+            apt = self._by_id.get(appointment_id)
+            if apt is None:
+                return None
+            previous = self.storage.version(COLLECTION)
+            self.storage.update(COLLECTION, appointment_id, fields)
+            apt.update(fields)
+            if 'patient_id' in fields or 'doctor_id' in fields:
+                self._rebuild(self._appointments)
+            self._mark_written(previous)
+            change_bus.publish(apt.get('doctor_id'), "appointment_updated", {"appointment": dict(apt), "fields": list(fields)})
+            return dict(apt)
+
+    def replace_all(self, appointments: List[Dict]):
+        """Replace every appointment (used by bulk writers)"""
+        with self._lock:
+            records = [dict(apt) for apt in appointments]
+            self.storage.replace_all(COLLECTION, records)
+            self._rebuild(records)
+            self._signature = self.storage.version(COLLECTION)
+
+
+# Shared repository used by routers and services
+appointment_repository = AppointmentRepository()
@@ -0,0 +1,159 @@
+"""
+Audio Normalizer
+Converts uploaded WAV recordings to the 16 kHz mono 16-bit PCM that speech
+recognition expects, so clients only upload the original recording once.
+
+Decoding and resampling are plain numpy (windowed-sinc low-pass, then linear
+interpolation) done block by block, so memory stays constant for long recordings.
+The CPU-heavy work runs in a process pool to keep it off the event loop and the GIL.
+"""
+import asyncio
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+from adapters.logger import logger
+
+# Input frames decoded per block
+READ_BLOCK_FRAMES = 48000 * 5
+
+# Length of the anti-aliasing filter used when downsampling
+LOWPASS_TAPS = 63
+
+_normalize_pool: Optional[ProcessPoolExecutor] = None
+_normalize_pool_lock = threading.Lock()
+
+
+def _decode(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """PCM bytes to mono float samples in [-1, 1]"""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float64) / 32768.0
+    elif sample_width == 3:
+        # 24-bit little endian: widen to int32 by putting the bytes in the top three
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        widened = np.zeros((len(packed), 4), dtype=np.uint8)
+        widened[:, 1:] = packed
+        samples = widened.view('<i4').ravel().astype(np.float64) / 2147483648.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float64) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    return samples.reshape(-1, channels).mean(axis=1)
+
+
+def _lowpass_taps(cutoff: float) -> np.ndarray:
+    """Hamming-windowed sinc low-pass; cutoff in cycles per input sample"""
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+    return taps / taps.sum()
+
+
+def normalize_wav(source_path: str, target_path: str, target_rate: int = Config.AUDIO_TARGET_SAMPLE_RATE) -> bool:
+    """
+    Write source_path as mono 16-bit PCM at target_rate to target_path.
+
+    Returns False (writing nothing) when the source already has that format.
+    Raises wave.Error, EOFError or ValueError for files that aren't PCM WAV.
+    """
+    with wave.open(source_path, 'rb') as source:
+        channels = source.getnchannels()
+        sample_width = source.getsampwidth()
+        source_rate = source.getframerate()
+        if (channels, sample_width, source_rate) == (1, 2, target_rate):
+            return False
+
+        step = source_rate / target_rate  # input samples per output sample
+        taps = _lowpass_taps(0.45 / step) if step > 1 else None
+        delay = (LOWPASS_TAPS - 1) / 2 if taps is not None else 0.0
+        history = np.zeros(LOWPASS_TAPS - 1) if taps is not None else None
+
+        total_in = source.getnframes()
+        # Filtered samples seen so far start at stream index `base`; `buffer` holds the
+        # tail still needed for interpolation
+        base = 0
+        buffer = np.zeros(0)
+        produced = 0
+        total_out = int(total_in / step)
+
+        with wave.open(target_path, 'wb') as target:
+            target.setnchannels(1)
+            target.setsampwidth(2)
+            target.setframerate(target_rate)
+
+            finished = False
+            while not finished:
+                raw = source.readframes(READ_BLOCK_FRAMES)
+                block = _decode(raw, sample_width, channels) if raw else np.zeros(0)
+                if not raw:
+                    finished = True
+                    if taps is not None:
+                        # Flush the filter so the last input samples come out
+                        block = np.zeros(LOWPASS_TAPS - 1)
+                if taps is not None:
+                    padded = np.concatenate([history, block])
+                    history = padded[-(LOWPASS_TAPS - 1):]
+                    block = np.convolve(padded, taps, mode='valid')
+                buffer = np.concatenate([buffer, block])
+                if len(buffer) < 2 and not finished:
+                    continue
+
+                # Output samples whose (delay-shifted) input position is inside the buffer
+                last = base + len(buffer) - 1
+                available = int(np.floor((last - delay) / step)) + 1 if last >= delay else 0
+                count = min(available, total_out) - produced
+                if count > 0:
+                    positions = (np.arange(produced, produced + count) * step + delay) - base
+                    out = np.interp(positions, np.arange(len(buffer)), buffer)
+                    target.writeframes((np.clip(out, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+                    produced += count
+
+                # Keep only the samples the next output still needs
+                keep_from = max(0, min(len(buffer) - 1, int(np.floor(produced * step + delay)) - base))
+                buffer = buffer[keep_from:]
+                base += keep_from
+    return True
+
+
+def get_normalize_pool() -> ProcessPoolExecutor:
+    """Shared audio normalization process pool (created on first use)"""
+    global _normalize_pool
+    with _normalize_pool_lock:
+        if _normalize_pool is None:
+            _normalize_pool = ProcessPoolExecutor(max_workers=Config.AUDIO_NORMALIZE_WORKERS)
+        return _normalize_pool
+
+
+def shutdown_normalize_pool():
+    """Stop the normalization workers (called on application shutdown)"""
+    global _normalize_pool
+    with _normalize_pool_lock:
+        if _normalize_pool is not None:
+            _normalize_pool.shutdown(wait=False, cancel_futures=True)
+            _normalize_pool = None
+
+
+async def normalize_recording(source_path: str, target_path: str) -> Optional[str]:
+    """
+    Path of a 16 kHz mono PCM version of the recording for transcription: target_path
+    once converted, source_path if it already has that format, or None if it isn't
+    a PCM WAV file that can be decoded here.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        converted = await loop.run_in_executor(get_normalize_pool(), normalize_wav, source_path, target_path)
+    except (wave.Error, EOFError, ValueError) as e:
+        logger.info(f"Not normalizing {source_path}: {e!r}")
+        Path(target_path).unlink(missing_ok=True)
+        return None
+    return target_path if converted else source_path
@@ -0,0 +1,162 @@
+"""
+Audio Segmenter
+Splits a PCM WAV recording at silences so the pieces can be transcribed in parallel.
+
+Pauses are found with a simple energy VAD: the RMS level of short frames is
+compared to the recording's own noise floor. The VAD only chooses where to cut;
+every segment is transcribed unless it is pure digital silence. The file is read
+in blocks, so only the per-frame energies (a few floats per second of audio) are
+kept in memory.
+"""
+import wave
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+
+# Frames read from the WAV file per block while measuring energy
+READ_BLOCK_FRAMES = 16000 * 10
+
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# Frames quieter than this are digital silence: they don't count towards the noise
+# floor, and segments made only of them are not transcribed
+DIGITAL_SILENCE_DB = -90.0
+
+
+def frame_energies(path: str, frame_ms: int = Config.VAD_FRAME_MS) -> Tuple[np.ndarray, int, int]:
+    """
+    RMS level in dBFS of every frame_ms window of a PCM WAV file.
+
+    Returns (energies, samples per VAD frame, sample rate). Raises wave.Error or
+    ValueError for files that aren't uncompressed PCM.
+    """
+    with wave.open(path, 'rb') as wav:
+        sample_width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        if sample_width not in SAMPLE_DTYPES:
+            raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+        frame_len = max(1, rate * frame_ms // 1000)
+        full_scale = float(2 ** (8 * sample_width - 1))
+        block_frames = max(frame_len, READ_BLOCK_FRAMES // frame_len * frame_len)
+
+        energies = []
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=SAMPLE_DTYPES[sample_width]).astype(np.float64)
+            if sample_width == 1:
+                samples -= 128.0  # 8-bit WAV is unsigned
+            samples = samples.reshape(-1, channels).mean(axis=1)
+            usable = len(samples) // frame_len * frame_len
+            if usable == 0:
+                break
+            frames = samples[:usable].reshape(-1, frame_len)
+            rms = np.sqrt(np.mean(frames ** 2, axis=1)) / full_scale
+            energies.append(20 * np.log10(np.maximum(rms, 1e-10)))
+
+    energies = np.concatenate(energies) if energies else np.zeros(0)
+    return energies, frame_len, rate
+
+
+def find_segments(energies: np.ndarray,
+                  frame_ms: int = Config.VAD_FRAME_MS,
+                  max_segment_seconds: float = Config.TRANSCRIPTION_SEGMENT_SECONDS,
+                  min_segment_seconds: float = Config.TRANSCRIPTION_MIN_SEGMENT_SECONDS,
+                  min_silence_ms: int = Config.VAD_MIN_SILENCE_MS,
+                  threshold_db: float = Config.VAD_THRESHOLD_DB) -> List[Tuple[int, int, bool]]:
+    """
+    Split frames into (start_frame, end_frame, audible) segments.
+
+    Segments end in the middle of the longest pause between min and max segment
+    length; when there is no pause in that range the segment is cut at max length.
+    `audible` is False only for segments that are entirely digital silence.
+    """
+    count = len(energies)
+    if count == 0:
+        return []
+
+    # Frames more than threshold_db above the noise floor (10th percentile) count as
+    # speech when looking for pauses to cut at
+    audible = energies[energies > DIGITAL_SILENCE_DB]
+    noise_floor = np.percentile(audible, 10) if len(audible) else DIGITAL_SILENCE_DB
+    speech = energies > noise_floor + threshold_db
+
+    # Silence runs long enough to cut at: (middle frame, run length)
+    min_run = max(1, min_silence_ms // frame_ms)
+    edges = np.diff(np.concatenate(([0], (~speech).astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    long_runs = (run_ends - run_starts) >= min_run
+    cut_points = ((run_starts + run_ends) // 2)[long_runs]
+    cut_lengths = (run_ends - run_starts)[long_runs]
+
+    max_frames = max(1, int(max_segment_seconds * 1000 // frame_ms))
+    min_frames = max(1, min(max_frames, int(min_segment_seconds * 1000 // frame_ms)))
+
+    segments = []
+    start = 0
+    while start < count:
+        if count - start <= max_frames:
+            end = count
+        else:
+            lo = np.searchsorted(cut_points, start + min_frames)
+            hi = np.searchsorted(cut_points, start + max_frames, side='right')
+            if hi > lo:
+                # Longest silence in range; the later one on ties
+                window = cut_lengths[lo:hi]
+                best = lo + len(window) - 1 - int(np.argmax(window[::-1]))
+                end = int(cut_points[best])
+            else:
+                end = start + max_frames
+        segments.append((start, end, bool((energies[start:end] > DIGITAL_SILENCE_DB).any())))
+        start = end
+    return segments
+
+
+def split_wav(path: str, out_dir: Path) -> List[Dict]:
+    """
+    Split a PCM WAV file at silences into numbered WAV files in out_dir.
+
+    Returns one dict per segment with its start/end time in seconds, whether it
+    is audible and the segment file path (None for digital silence, which isn't
+    written).
+    """
+    energies, frame_len, rate = frame_energies(path)
+    segments = []
+    with wave.open(path, 'rb') as wav:
+        params = wav.getparams()
+        total_frames = wav.getnframes()
+        for index, (start, end, audible) in enumerate(find_segments(energies)):
+            start_sample = start * frame_len
+            # The last segment also takes the samples after the final full VAD frame
+            end_sample = total_frames if end == len(energies) else end * frame_len
+            segment_path = None
+            if audible:
+                segment_path = out_dir / f"segment_{index:04d}.wav"
+                wav.setpos(start_sample)
+                with wave.open(str(segment_path), 'wb') as out:
+                    out.setparams(params)
+                    remaining = end_sample - start_sample
+                    while remaining > 0:
+                        chunk = wav.readframes(min(remaining, READ_BLOCK_FRAMES))
+                        if not chunk:
+                            break
+                        out.writeframes(chunk)
+                        remaining -= READ_BLOCK_FRAMES
+            segments.append({
+                "index": index,
+                "start": round(start_sample / rate, 3),
+                "end": round(end_sample / rate, 3),
+                "audible": audible,
+                "path": segment_path,
+            })
+    return segments
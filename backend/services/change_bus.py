@@ -0,0 +1,83 @@
+"""
+Change Bus
+In-process publish/subscribe for data changes, used to push patient queue and
+appointment updates to doctor dashboards instead of having them poll.
+
+Writers publish to a topic (a doctor id, or job:<job_id> for job updates); each
+subscriber gets its own bounded asyncio queue. Publishing never blocks: a subscriber
+that falls too far behind is sent a single "resync" event and should reload its
+snapshot.
+"""
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+from adapters.logger import logger
+
+RESYNC_EVENT = "resync"
+
+
+class ChangeBus:
+    """Topic-based fan-out of change events to asyncio subscribers"""
+
+    def __init__(self, max_pending: int = Config.CHANGE_BUS_MAX_PENDING):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        """Register a subscriber for topic; must be called from a running event loop"""
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = [sub for sub in self._subscribers.get(topic, []) if sub[1] is not queue]
+            if subscribers:
+                self._subscribers[topic] = subscribers
+            else:
+                self._subscribers.pop(topic, None)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, []))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, topic: Optional[str], event: str, data: Dict):
+        """Send an event to every subscriber of topic (safe to call from any thread)"""
+        if not topic:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, []))
+        if not subscribers:
+            return
+        message = {"event": event, "data": data, "published_at": datetime.now().isoformat()}
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # Subscriber's loop is closed; it unsubscribes when its stream ends
+                logger.debug(f"Dropping change event for closed loop on topic {topic}")
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, message: Dict):
+        if queue.full():
+            # Too far behind: replace the backlog with one resync marker
+            while not queue.empty():
+                queue.get_nowait()
+            message = {"event": RESYNC_EVENT, "data": {}, "published_at": message["published_at"]}
+        queue.put_nowait(message)
+
+
+# Shared change bus; topics are doctor ids and job topics
+change_bus = ChangeBus()
@@ -0,0 +1,212 @@
+"""
+Conversation Log
+Append-only JSONL storage for triage conversations.
+
+Each session lives in `{session_id}.jsonl` with one JSON record per line:
+- {"kind": "header", "session_id", "user_id", "created_at", "collected_info", "status"}
+- {"kind": "message", "id", "type", "content", "timestamp", "metadata"}
+- {"kind": "state", "collected_info": {...}, "status": "..."}  (partial updates)
+
+Adding a message is a single append write. Loading replays the log; once a log
+has accumulated enough state records it is compacted, folding every state
+update into the header. Legacy `{session_id}.json` files are still readable and
+are converted to the log format on their first write.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from pathlib import Path
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.logger import logger
+
+# Paths - conversations are stored in the patient folder
+DATA_DIR = backend_path / "data"
+PATIENT_DIR = DATA_DIR / "patient"
+CONVERSATIONS_DIR = PATIENT_DIR / "conversations"
+CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Number of state records after which a log is folded on load
+COMPACT_AFTER_STATE_RECORDS = 20
+
+
+class ConversationLog:
+    """Append-only conversation store with replay and compaction"""
+
+    def __init__(self, directory: Path = CONVERSATIONS_DIR,
+                 compact_after: int = COMPACT_AFTER_STATE_RECORDS):
+        self.directory = Path(directory)
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        # session_id -> number of messages, so appends don't need a replay
+        self._message_counts: Dict[str, int] = {}
+
+    def _log_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.jsonl"
+
+    def _legacy_path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
+
+    def _append_lines(self, path: Path, records: List[Dict]):
+        """Append records with a single write() call"""
+        payload = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+
+    def _write_snapshot(self, session_id: str, conversation: Dict):
+        """Write a conversation as header + messages, replacing any existing log"""
+        header = {
+            "kind": "header",
+            "session_id": conversation.get("session_id", session_id),
+            "user_id": conversation.get("user_id"),
+            "created_at": conversation.get("created_at"),
+            "collected_info": conversation.get("collected_info", {}),
+            "status": conversation.get("status", "active"),
+        }
+        records = [header] + [{"kind": "message", **msg} for msg in conversation.get("messages", [])]
+        path = self._log_path(session_id)
+        tmp_path = path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        os.replace(tmp_path, path)
+        self._message_counts[session_id] = len(conversation.get("messages", []))
+
+    def _replay(self, path: Path):
+        """Rebuild a conversation from its log; returns (conversation, state_record_count)"""
+        conversation = None
+        state_records = 0
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append is skipped
+                    logger.warning(f"Skipping malformed record in {path}")
+                    continue
+                kind = record.pop("kind", None)
+                if kind == "header":
+                    conversation = {
+                        "session_id": record.get("session_id"),
+                        "user_id": record.get("user_id"),
+                        "created_at": record.get("created_at"),
+                        "messages": [],
+                        "collected_info": record.get("collected_info") or {},
+                        "status": record.get("status", "active"),
+                    }
+                elif conversation is None:
+                    continue
+                elif kind == "message":
+                    conversation["messages"].append(record)
+                elif kind == "state":
+                    state_records += 1
+                    if record.get("collected_info"):
+                        conversation["collected_info"].update(record["collected_info"])
+                    if record.get("status"):
+                        conversation["status"] = record["status"]
+        return conversation, state_records
+
+    def _remember_count(self, session_id: str, count: int):
+        """Record a replayed message count without going backwards past a concurrent append"""
+        self._message_counts[session_id] = max(self._message_counts.get(session_id, 0), count)
+
+    def exists(self, session_id: str) -> bool:
+        return self._log_path(session_id).exists() or self._legacy_path(session_id).exists()
+
+    def create(self, conversation: Dict):
+        """Create a new conversation log"""
+        with self._lock:
+            self._write_snapshot(conversation["session_id"], conversation)
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        """Load a conversation by replaying its log (or reading a legacy JSON file)"""
+        path = self._log_path(session_id)
+        if path.exists():
+            conversation, state_records = self._replay(path)
+            if conversation is None:
+                return None
+            self._remember_count(session_id, len(conversation["messages"]))
+            if state_records >= self.compact_after:
+                self.compact(session_id)
+            return conversation
+
+        legacy_path = self._legacy_path(session_id)
+        if legacy_path.exists():
+            with open(legacy_path, "r") as f:
+                conversation = json.load(f)
+            self._remember_count(session_id, len(conversation.get("messages", [])))
+            return conversation
+        return None
+
+    def append_message(self, session_id: str, message: Dict, state: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Append a message (and an optional state update) to a conversation.
+
+        The message id is assigned here. Returns the stored message, or None if
+        the session does not exist.
+        """
+        with self._lock:
+            path = self._log_path(session_id)
+            if not path.exists():
+                legacy_path = self._legacy_path(session_id)
+                if not legacy_path.exists():
+                    return None
+                # Convert a legacy conversation to the log format on first write
+                with open(legacy_path, "r") as f:
+                    self._write_snapshot(session_id, json.load(f))
+                legacy_path.unlink()
+
+            if session_id not in self._message_counts:
+                conversation, _ = self._replay(path)
+                self._message_counts[session_id] = len(conversation["messages"]) if conversation else 0
+
+            stored = {"id": self._message_counts[session_id] + 1, **message}
+            records = [{"kind": "message", **stored}]
+            if state:
+                records.append({"kind": "state", **state})
+            self._append_lines(path, records)
+            self._message_counts[session_id] = stored["id"]
+            return stored
+
+    def compact(self, session_id: str):
+        """Fold all state records of a log into its header"""
+        with self._lock:
+            path = self._log_path(session_id)
+            if not path.exists():
+                return
+            # Replay under the lock so no concurrent append is lost
+            conversation, _ = self._replay(path)
+            if conversation is None:
+                return
+            self._write_snapshot(session_id, conversation)
+            logger.info(f"Compacted conversation log: {session_id}")
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a conversation (log and/or legacy file)"""
+        with self._lock:
+            deleted = False
+            for path in (self._log_path(session_id), self._legacy_path(session_id)):
+                if path.exists():
+                    path.unlink()
+                    deleted = True
+            self._message_counts.pop(session_id, None)
+            return deleted
+
+    def session_ids(self) -> List[str]:
+        """List every stored session id"""
+        ids = {path.stem for path in self.directory.glob("*.jsonl")}
+        ids.update(path.stem for path in self.directory.glob("*.json"))
+        return list(ids)
+
+
+# Shared conversation log used by the triage agent and summary service
+conversation_log = ConversationLog()
@@ -0,0 +1,199 @@
+"""
+Background Job Queue
+Durable queue for work that shouldn't block a request (appointment notes, queue entries, ...).
+
+Jobs are persisted in the "jobs" storage collection, so they survive restarts: on
+startup every job still queued or interrupted mid-run is picked up again by the
+queue that handles its type. Workers are asyncio tasks started from the FastAPI
+lifespan. A failed job is retried with exponential backoff until it reaches
+max_attempts. Status changes are published on the change bus (see job_topic).
+"""
+import asyncio
+import contextvars
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+from adapters.logger import logger
+from adapters.storage import StorageBackend, get_storage
+from services.change_bus import change_bus
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+JobHandler = Callable[[Dict], Awaitable[Optional[Dict]]]
+
+# Job being run by the current worker task (used by report_progress)
+_current_job: contextvars.ContextVar[Optional[Tuple["JobQueue", str]]] = contextvars.ContextVar("current_job", default=None)
+
+
+def job_topic(job_id: str) -> str:
+    """Change bus topic carrying a job's status updates"""
+    return f"job:{job_id}"
+
+
+def report_progress(progress: Dict):
+    """Record progress (e.g. {"stage": "transcribing"}) on the job the calling handler runs"""
+    current = _current_job.get()
+    if current is not None:
+        queue, job_id = current
+        queue._update(job_id, progress=progress)
+
+
+class JobQueue:
+    """
+    Persistent job queue with asyncio workers and retries.
+
+    Handlers are registered per job type and receive the job payload; whatever dict
+    they return is stored as the job result. Handlers should be idempotent since a
+    job interrupted by a restart runs again.
+    """
+
+    def __init__(self, storage: Optional[StorageBackend] = None, workers: int = Config.JOB_WORKERS,
+                 max_attempts: int = Config.JOB_MAX_ATTEMPTS, retry_delay: float = Config.JOB_RETRY_BASE_DELAY):
+        self._storage = storage
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._timers: List[asyncio.TimerHandle] = []
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self._storage or get_storage()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def register(self, job_type: str, handler: JobHandler):
+        """Register the coroutine function that runs jobs of job_type"""
+        self._handlers[job_type] = handler
+
+    def enqueue(self, job_type: str, payload: Dict, max_attempts: Optional[int] = None) -> Dict:
+        """Persist a new job and hand it to the workers; returns the job record"""
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "type": job_type,
+            "status": JOB_QUEUED,
+            "payload": payload,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.storage.insert("jobs", job)
+        if self._queue is not None:
+            self._queue.put_nowait(job["job_id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.storage.get("jobs", job_id)
+
+    def _update(self, job_id: str, **fields) -> Optional[Dict]:
+        fields["updated_at"] = datetime.now().isoformat()
+        job = self.storage.update("jobs", job_id, fields)
+        if job is not None:
+            change_bus.publish(job_topic(job_id), "job", dict(job))
+        return job
+
+    async def start(self):
+        """Start the workers and re-queue jobs left over from a previous run"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._prune()
+        pending = [
+            job for job in self.storage.find("jobs", "status", JOB_QUEUED) + self.storage.find("jobs", "status", JOB_RUNNING)
+            if job.get("type") in self._handlers  # other queues own the rest
+        ]
+        for job in pending:
+            if job["status"] == JOB_RUNNING:
+                self._update(job["job_id"], status=JOB_QUEUED)
+            self._queue.put_nowait(job["job_id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        logger.info(f"STATUS: Job queue started with {len(self._tasks)} workers ({len(pending)} pending jobs)")
+
+    async def stop(self):
+        """Stop the workers; jobs still running are resumed on the next start"""
+        for timer in self._timers:
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._timers = []
+        self._queue = None
+
+    def _prune(self):
+        """Drop finished jobs older than Config.JOB_RETENTION_SECONDS"""
+        cutoff = datetime.fromtimestamp(time.time() - Config.JOB_RETENTION_SECONDS).isoformat()
+        for status in (JOB_SUCCEEDED, JOB_FAILED):
+            for job in self.storage.find("jobs", "status", status):
+                if job.get("updated_at", "") < cutoff:
+                    self.storage.delete("jobs", job["job_id"])
+
+    def _retry_later(self, job_id: str, delay: float):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        self._timers = [timer for timer in self._timers if not timer.cancelled()]
+        self._timers.append(loop.call_later(delay, queue.put_nowait, job_id))
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker error for {job_id}: {e}", exc_info=True)
+
+    async def _run(self, job_id: str):
+        job = self.get(job_id)
+        if job is None or job.get("status") != JOB_QUEUED:
+            return
+        handler = self._handlers.get(job["type"])
+        if handler is None:
+            self._update(job_id, status=JOB_FAILED, error=f"No handler registered for job type {job['type']}")
+            return
+
+        attempts = job.get("attempts", 0) + 1
+        self._update(job_id, status=JOB_RUNNING, attempts=attempts)
+        token = _current_job.set((self, job_id))
+        try:
+            result = await handler(job.get("payload") or {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempts < job.get("max_attempts", self.max_attempts):
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                logger.warning(f"Job {job_id} ({job['type']}) failed on attempt {attempts}, retrying in {delay:.1f}s: {e}")
+                self._update(job_id, status=JOB_QUEUED, error=str(e))
+                self._retry_later(job_id, delay)
+            else:
+                logger.error(f"Job {job_id} ({job['type']}) failed after {attempts} attempts: {e}", exc_info=True)
+                self._update(job_id, status=JOB_FAILED, error=str(e))
+            return
+        finally:
+            _current_job.reset(token)
+        self._update(job_id, status=JOB_SUCCEEDED, result=result, error=None)
+
+
+# Shared job queues, started and stopped by the FastAPI lifespan. Consultation
+# recordings get their own workers so long transcriptions don't hold up other jobs.
+job_queue = JobQueue()
+consultation_queue = JobQueue(workers=Config.CONSULTATION_WORKERS)
@@ -0,0 +1,122 @@
+"""
+Incremental JSON field extraction
+Pulls the value of one top-level string field out of a JSON object while it is still streaming.
+"""
+from typing import Optional
+
+_ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+
+class JSONStringFieldStreamer:
+    """
+    Feed chunks of a streamed JSON object and get back newly decoded text of a
+    top-level string field (e.g. "message") as soon as it arrives.
+
+    Only the value of `field` at nesting depth 1 is emitted; other keys, nested
+    objects and arrays are skipped. The full object should still be parsed with
+    json.loads once the stream ends.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.unicode_digits: Optional[str] = None
+        self.high_surrogate: Optional[int] = None
+        self.current_string = []
+        self.last_key: Optional[str] = None
+        self.expecting_value = False
+        self.capturing = False
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; returns decoded text of the target field contained in it"""
+        out = []
+        for ch in chunk:
+            if self.in_string:
+                decoded = self._consume_string_char(ch)
+                if decoded is not None and self.capturing:
+                    out.append(decoded)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.current_string = []
+                # A string that starts right after `"field":` at depth 1 is the value we want
+                self.capturing = (
+                    not self.done
+                    and self.expecting_value
+                    and self.depth == 1
+                    and self.last_key == self.field
+                )
+            elif ch in '{[':
+                self.depth += 1
+                self.expecting_value = False
+            elif ch in '}]':
+                self.depth -= 1
+            elif ch == ':':
+                self.expecting_value = True
+            elif ch == ',':
+                self.expecting_value = False
+                self.last_key = None
+        return "".join(out)
+
+    def _consume_string_char(self, ch: str) -> Optional[str]:
+        """Advance inside a string literal; returns the decoded character, if any"""
+        if self.unicode_digits is not None:
+            self.unicode_digits += ch
+            if len(self.unicode_digits) < 4:
+                return None
+            try:
+                code = int(self.unicode_digits, 16)
+            except ValueError:
+                code = 0xFFFD
+            self.unicode_digits = None
+            if 0xD800 <= code <= 0xDBFF:
+                # First half of a surrogate pair; wait for the second \uXXXX
+                self.high_surrogate = code
+                return None
+            if 0xDC00 <= code <= 0xDFFF and self.high_surrogate is not None:
+                code = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self.high_surrogate = None
+            decoded = chr(code)
+            self.current_string.append(decoded)
+            return decoded
+        if self.escape:
+            self.escape = False
+            if ch == 'u':
+                self.unicode_digits = ""
+                return None
+            decoded = _ESCAPES.get(ch, ch)
+            self.current_string.append(decoded)
+            return decoded
+        if ch == '\\':
+            self.escape = True
+            return None
+        if ch == '"':
+            self._end_string()
+            return None
+        self.current_string.append(ch)
+        return ch
+
+    def _end_string(self):
+        self.in_string = False
+        value = "".join(self.current_string)
+        if self.capturing:
+            self.capturing = False
+            self.done = True
+        if self.depth == 1 and not self.expecting_value:
+            # The string was an object key
+            self.last_key = value
+        else:
+            self.expecting_value = False
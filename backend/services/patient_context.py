@@ -0,0 +1,146 @@
+"""
+Patient Context
+Per-request view of one patient's data (appointments, medical records, triage sessions
+and conversations). Each piece is loaded on first use and reused for the rest of the
+request, so the summary service, appointment notes and triage agent can share one
+context instead of each re-reading the same files.
+"""
+from typing import Dict, List, Optional
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.logger import logger
+from adapters.storage import get_storage
+from services.appointment_repository import appointment_repository
+from services.conversation_log import conversation_log
+from services.session_index import session_index
+
+
+class PatientContext:
+    """
+    Lazily loaded, memoized patient data for a single request.
+
+    Attributes:
+        patient_id (str): The patient the context belongs to.
+        appointment_id (str): The appointment the request is about, if any.
+        triage_session_id (str): The triage session the request is about, if any.
+    """
+
+    def __init__(self, patient_id: Optional[str], appointment_id: Optional[str] = None,
+                 triage_session_id: Optional[str] = None):
+        self.patient_id = patient_id
+        self.appointment_id = appointment_id
+        self.triage_session_id = triage_session_id
+        self._appointments: Optional[List[Dict]] = None
+        self._appointments_by_id: Dict[str, Optional[Dict]] = {}
+        self._medical_records: Optional[List[Dict]] = None
+        self._triage_sessions: Optional[List[Dict]] = None
+        self._conversations: Dict[str, Optional[Dict]] = {}
+
+    @classmethod
+    def for_appointment(cls, appointment_id: str) -> "PatientContext":
+        """Context for the patient of an appointment (patient and triage session taken from it)"""
+        appointment = appointment_repository.get(appointment_id)
+        context = cls(
+            appointment.get("patient_id") if appointment else None,
+            appointment_id=appointment_id,
+            triage_session_id=appointment.get("triage_session_id") if appointment else None,
+        )
+        context._appointments_by_id[appointment_id] = appointment
+        return context
+
+    @classmethod
+    def for_triage_session(cls, session_id: str) -> "PatientContext":
+        """Context for the patient of a triage session (patient taken from its conversation)"""
+        context = cls(None, triage_session_id=session_id)
+        conversation = context.conversation()
+        context.patient_id = conversation.get("user_id") if conversation else None
+        return context
+
+    @property
+    def appointments(self) -> List[Dict]:
+        """All appointments of the patient"""
+        if self._appointments is None:
+            try:
+                self._appointments = appointment_repository.for_patient(self.patient_id)
+            except Exception as e:
+                logger.error(f"Error loading appointments: {e}")
+                self._appointments = []
+            for appointment in self._appointments:
+                self._appointments_by_id[appointment.get("appointment_id")] = appointment
+        return self._appointments
+
+    def appointment(self, appointment_id: Optional[str] = None) -> Optional[Dict]:
+        """One appointment (the context's appointment by default)"""
+        appointment_id = appointment_id or self.appointment_id
+        if not appointment_id:
+            return None
+        if appointment_id not in self._appointments_by_id:
+            self._appointments_by_id[appointment_id] = appointment_repository.get(appointment_id)
+        return self._appointments_by_id[appointment_id]
+
+    def remember_appointment(self, appointment: Dict):
+        """Replace the cached copy of an appointment after it was updated"""
+        self._appointments_by_id[appointment.get("appointment_id")] = appointment
+        if self._appointments is not None:
+            self._appointments = [
+                appointment if apt.get("appointment_id") == appointment.get("appointment_id") else apt
+                for apt in self._appointments
+            ]
+
+    @property
+    def medical_records(self) -> List[Dict]:
+        """All medical records of the patient"""
+        if self._medical_records is None:
+            try:
+                self._medical_records = get_storage().find("medical_records", "patient_id", self.patient_id)
+            except Exception as e:
+                logger.error(f"Error loading medical records: {e}")
+                self._medical_records = []
+        return self._medical_records
+
+    @property
+    def triage_sessions(self) -> List[Dict]:
+        """All triage conversations of the patient"""
+        if self._triage_sessions is None:
+            sessions = []
+            try:
+                for session_id in session_index.session_ids(self.patient_id or None):
+                    session = self.conversation(session_id)
+                    if session:
+                        sessions.append(session)
+            except Exception as e:
+                logger.error(f"Error loading triage sessions: {e}")
+            self._triage_sessions = sessions
+        return self._triage_sessions
+
+    def conversation(self, session_id: Optional[str] = None) -> Optional[Dict]:
+        """One triage conversation (the context's triage session by default)"""
+        session_id = session_id or self.triage_session_id
+        if not session_id:
+            return None
+        if session_id not in self._conversations:
+            try:
+                self._conversations[session_id] = conversation_log.load(session_id)
+            except Exception as e:
+                logger.warning(f"Error loading conversation {session_id}: {e}")
+                self._conversations[session_id] = None
+        return self._conversations[session_id]
+
+    def conversation_history(self, session_id: Optional[str] = None) -> List[Dict]:
+        """(type, content) messages of a triage conversation, or [] if there is none"""
+        conversation = self.conversation(session_id)
+        if not conversation:
+            return []
+        return [
+            {"type": msg.get("type"), "content": msg.get("content")}
+            for msg in conversation.get("messages", [])
+        ]
+
+    def collected_info(self, session_id: Optional[str] = None) -> Dict:
+        """Information collected in a triage conversation"""
+        conversation = self.conversation(session_id)
+        return (conversation or {}).get("collected_info") or {}
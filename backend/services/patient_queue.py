@@ -0,0 +1,200 @@
+"""
+Patient Queue
+Live per-doctor queue of upcoming patients, kept as a binary heap keyed on the parsed
+appointment datetime (optionally pulled forward by triage score).
+
+The heap is maintained incrementally as queue entries are written and appointment
+statuses change, and every change is published on the change bus; completed and
+cancelled patients leave the queue. Like the appointment repository, the in-memory
+state is only rebuilt when the patient_queue collection was changed by someone else.
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+from adapters.logger import logger
+from adapters.storage import StorageBackend, get_storage
+from services.change_bus import change_bus
+from utils import parse_appointment_datetime
+
+COLLECTION = "patient_queue"
+
+# Statuses that take a patient out of the live queue
+DONE_STATUSES = {"completed", "cancelled"}
+
+# How many "slots" of Config.PATIENT_QUEUE_TRIAGE_WEIGHT_MINUTES each triage level moves a patient up
+TRIAGE_LEVELS = {"high": 2, "medium": 1, "low": 0}
+
+HeapItem = Tuple[datetime, int, str]
+
+
+class DoctorQueue:
+    """
+    Heap of one doctor's waiting patients with lazy deletion.
+
+    Removed or re-keyed entries stay in the heap until they reach the top (or the
+    heap is compacted); `entries` holds the live item per appointment.
+    """
+
+    def __init__(self):
+        self.heap: List[HeapItem] = []
+        self.entries: Dict[str, Tuple[HeapItem, Dict]] = {}
+
+    def push(self, item: HeapItem, entry: Dict):
+        self.entries[item[2]] = (item, entry)
+        heapq.heappush(self.heap, item)
+        self._compact()
+
+    def remove(self, appointment_id: str) -> bool:
+        if self.entries.pop(appointment_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def _is_live(self, item: HeapItem) -> bool:
+        current = self.entries.get(item[2])
+        return current is not None and current[0] is item
+
+    def _compact(self):
+        """Drop stale items from the top, and rebuild once they outnumber live ones"""
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = [item for item, _ in self.entries.values()]
+            heapq.heapify(self.heap)
+
+    def next(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Live entries in queue order. Walks the heap best-first with a frontier of
+        candidate positions, so the first k entries cost O(k log k), not a full sort.
+        """
+        limit = len(self.entries) if limit is None else min(limit, len(self.entries))
+        result = []
+        frontier = [(self.heap[0], 0)] if self.heap else []
+        while frontier and len(result) < limit:
+            item, i = heapq.heappop(frontier)
+            if self._is_live(item):
+                result.append(self.entries[item[2]][1])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return result
+
+
+class PatientQueue:
+    """Indexed in-memory view of the patient_queue collection, one heap per doctor"""
+
+    def __init__(self, storage: Optional[StorageBackend] = None,
+                 triage_weight_minutes: int = Config.PATIENT_QUEUE_TRIAGE_WEIGHT_MINUTES):
+        self._storage = storage
+        self.triage_weight = timedelta(minutes=triage_weight_minutes)
+        self._lock = threading.RLock()
+        self._signature = None
+        self._doctors: Dict[str, DoctorQueue] = {}
+        self._doctor_of: Dict[str, str] = {}
+        self._counter = itertools.count()
+
+    @property
+    def storage(self) -> StorageBackend:
+        if self._storage is None:
+            self._storage = get_storage()
+        return self._storage
+
+    def _key(self, entry: Dict) -> datetime:
+        start = parse_appointment_datetime(entry.get("appointment_date"), entry.get("appointment_time"))
+        if start is None:
+            # Unparseable times go to the back of the queue
+            return datetime.max
+        level = TRIAGE_LEVELS.get(str(entry.get("triage_score", "")).lower(), 0)
+        return start - self.triage_weight * level
+
+    def _index(self, entry: Dict) -> Optional[str]:
+        """
+        Put an entry in (or take it out of) its doctor's heap; returns the change
+        ("patient_added", "patient_updated", "patient_removed") or None
+        """
+        appointment_id = entry.get("appointment_id")
+        if not appointment_id:
+            return None
+        previous_doctor = self._doctor_of.pop(appointment_id, None)
+        if previous_doctor is not None:
+            self._doctors[previous_doctor].remove(appointment_id)
+        if entry.get("status") in DONE_STATUSES:
+            return "patient_removed" if previous_doctor is not None else None
+        doctor_id = entry.get("doctor_id")
+        item = (self._key(entry), next(self._counter), appointment_id)
+        self._doctors.setdefault(doctor_id, DoctorQueue()).push(item, entry)
+        self._doctor_of[appointment_id] = doctor_id
+        return "patient_updated" if previous_doctor == doctor_id else "patient_added"
+
+    def _publish(self, change: Optional[str], entry: Dict):
+        if change:
+            change_bus.publish(entry.get("doctor_id"), change, {"patient": dict(entry)})
+
+    def _refresh(self):
+        """Rebuild the heaps if the collection changed since the last load"""
+        signature = self.storage.version(COLLECTION)
+        if signature == self._signature:
+            return
+        try:
+            entries = self.storage.load_all(COLLECTION)
+        except Exception as e:
+            logger.error(f"Error loading patient queue: {e}")
+            return
+        self._doctors = {}
+        self._doctor_of = {}
+        for entry in entries:
+            self._index(entry)
+        self._signature = signature
+
+    def _mark_written(self, previous_signature):
+        """Adopt the backend's new version after our own write (see AppointmentRepository)"""
+        if self._signature == previous_signature:
+            self._signature = self.storage.version(COLLECTION)
+        else:
+            self._signature = None
+
+    def for_doctor(self, doctor_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """The doctor's next `limit` patients (all waiting patients by default), earliest first"""
+        with self._lock:
+            self._refresh()
+            queue = self._doctors.get(doctor_id)
+            return [dict(entry) for entry in queue.next(limit)] if queue else []
+
+    def upsert(self, entry: Dict) -> Dict:
+        """Insert or replace a queue entry and persist it"""
+        with self._lock:
+            self._refresh()
+            previous = self.storage.version(COLLECTION)
+            record = dict(entry)
+            self.storage.upsert(COLLECTION, record)
+            change = self._index(record)
+            self._mark_written(previous)
+            self._publish(change, record)
+            return dict(record)
+
+    def update_status(self, appointment_id: str, status: str) -> Optional[Dict]:
+        """Set a queue entry's status; done statuses remove the patient from the queue"""
+        with self._lock:
+            self._refresh()
+            previous = self.storage.version(COLLECTION)
+            record = self.storage.update(COLLECTION, appointment_id, {"status": status})
+            if record is None:
+                return None
+            record = dict(record)
+            change = self._index(record)
+            self._mark_written(previous)
+            self._publish(change, record)
+            return record
+
+
+# Shared patient queue used by the appointments router and background jobs
+patient_queue = PatientQueue()
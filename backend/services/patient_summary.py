@@ -11,8 +11,9 @@ import sys
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from adapters.azure_openai import AzureOpenAIHelper
+from adapters.azure_openai import get_llm
 from adapters.logger import logger
+from services.patient_context import PatientContext
 
 # Paths - organized by patient and doctor folders
 DATA_DIR = backend_path / "data"
@@ -21,8 +22,6 @@ DOCTOR_DIR = DATA_DIR / "doctor"
 PATIENT_DIR.mkdir(parents=True, exist_ok=True)
 DOCTOR_DIR.mkdir(parents=True, exist_ok=True)
 
-APPOINTMENTS_FILE = DOCTOR_DIR / "appointments.json"
-MEDICAL_RECORDS_FILE = PATIENT_DIR / "medical_records.json"
 CONVERSATIONS_DIR = PATIENT_DIR / "conversations"
 CONVERSATIONS_DIR.mkdir(exist_ok=True)
 
@@ -31,49 +30,7 @@ class PatientSummaryService:
     """Service to generate patient summaries for doctors"""
     
     def __init__(self):
-        self.llm = AzureOpenAIHelper()
-    
-    def _load_appointments(self, patient_id: str) -> List[Dict]:
-        """Load appointments for a patient"""
-        try:
-            if APPOINTMENTS_FILE.exists():
-                with open(APPOINTMENTS_FILE, 'r') as f:
-                    data = json.load(f)
-                    return [apt for apt in data.get('appointments', []) if apt.get('patient_id') == patient_id]
-            return []
-        except Exception as e:
-            logger.error(f"Error loading appointments: {e}")
-            return []
-    
-    def _load_medical_records(self, patient_id: str) -> List[Dict]:
-        """Load medical records for a patient"""
-        try:
-            if MEDICAL_RECORDS_FILE.exists():
-                with open(MEDICAL_RECORDS_FILE, 'r') as f:
-                    data = json.load(f)
-                    return [rec for rec in data.get('records', []) if rec.get('patient_id') == patient_id]
-            return []
-        except Exception as e:
-            logger.error(f"Error loading medical records: {e}")
-            return []
-    
-    def _load_triage_sessions(self, patient_id: Optional[str] = None) -> List[Dict]:
-        """Load triage sessions (if patient_id is provided, filter by it)"""
-        sessions = []
-        try:
-            if CONVERSATIONS_DIR.exists():
-                for file_path in CONVERSATIONS_DIR.glob("*.json"):
-                    try:
-                        with open(file_path, 'r') as f:
-                            session = json.load(f)
-                            if not patient_id or session.get("user_id") == patient_id:
-                                sessions.append(session)
-                    except Exception as e:
-                        continue
-            return sessions
-        except Exception as e:
-            logger.error(f"Error loading triage sessions: {e}")
-            return []
+        self.llm = get_llm()
     
     def _build_summary_prompt(self, patient_name: str, appointments: List[Dict], 
                               medical_records: List[Dict], triage_sessions: List[Dict]) -> str:
@@ -140,13 +97,15 @@ Generate the summary now:"""
         
         return prompt
     
-    def generate_summary(self, patient_id: str, patient_name: str, patient_email: str) -> Dict:
+    def generate_summary(self, patient_id: str, patient_name: str, patient_email: str,
+                         context: Optional[PatientContext] = None) -> Dict:
         """Generate simple 2-line patient summary from appointments.json"""
         try:
-            # Load all patient data
-            appointments = self._load_appointments(patient_id)
-            medical_records = self._load_medical_records(patient_id)
-            triage_sessions = self._load_triage_sessions(patient_id)
+            # Load all patient data (once per request, shared through the context)
+            context = context or PatientContext(patient_id)
+            appointments = context.appointments
+            medical_records = context.medical_records
+            triage_sessions = context.triage_sessions
             
             # Get the most recent appointment
             latest_appointment = None
@@ -170,11 +129,7 @@ Generate the summary now:"""
                 # Get duration from triage session if available
                 duration = None
                 if latest_appointment.get('triage_session_id'):
-                    for session in triage_sessions:
-                        if session.get('session_id') == latest_appointment.get('triage_session_id'):
-                            collected_info = session.get('collected_info', {})
-                            duration = collected_info.get('duration')
-                            break
+                    duration = context.collected_info(latest_appointment.get('triage_session_id')).get('duration')
                 
                 # Line 1: Symptoms with duration
                 line1 = symptoms or "General consultation"
@@ -231,20 +186,13 @@ Generate the summary now:"""
                                            pain_rating: Optional[str],
                                            appointment_date: str,
                                            appointment_time: str,
-                                           ai_summary: Optional[List[str]] = None) -> Dict:
+                                           ai_summary: Optional[List[str]] = None,
+                                           context: Optional[PatientContext] = None) -> Dict:
         """Generate simple 2-line patient summary for patient queue from appointments.json"""
         try:
-            # Load appointment from appointments.json
-            appointment = None
-            if APPOINTMENTS_FILE.exists():
-                with open(APPOINTMENTS_FILE, 'r') as f:
-                    data = json.load(f)
-                    appointments_list = data.get('appointments', [])
-                    # Find the appointment by appointment_id
-                    for apt in appointments_list:
-                        if apt.get('appointment_id') == appointment_id:
-                            appointment = apt
-                            break
+            # Load appointment through the request's patient context
+            context = context or PatientContext(patient_id, appointment_id=appointment_id)
+            appointment = context.appointment(appointment_id)
             
             # Get symptoms and pain_rating from appointment if not provided
             if appointment:
@@ -284,15 +232,7 @@ Generate the summary now:"""
                 # Get duration from triage session if available
                 duration = None
                 if appointment and appointment.get('triage_session_id'):
-                    try:
-                        triage_sessions = self._load_triage_sessions(patient_id)
-                        for session in triage_sessions:
-                            if session.get('session_id') == appointment.get('triage_session_id'):
-                                collected_info = session.get('collected_info', {})
-                                duration = collected_info.get('duration')
-                                break
-                    except:
-                        pass
+                    duration = context.collected_info(appointment.get('triage_session_id')).get('duration')
                 
                 # Create simple 2-line summary from appointments.json data
                 # Line 1: Symptoms with duration if available
@@ -340,21 +280,10 @@ Generate the summary now:"""
                 except:
                     pass
             
-            # Get patient profile info from triage session if available
+            # Patient profile info isn't collected in triage yet
             age = None
             gender = None
             blood_group = None
-            if appointment and appointment.get('triage_session_id'):
-                try:
-                    triage_sessions = self._load_triage_sessions(patient_id)
-                    for session in triage_sessions:
-                        if session.get('session_id') == appointment.get('triage_session_id'):
-                            collected_info = session.get('collected_info', {})
-                            # Try to extract from collected_info if available
-                            # For now, use defaults as these aren't collected in triage
-                            break
-                except:
-                    pass
             
             # Create queue entry with patient profile info
             queue_entry = {
@@ -0,0 +1,167 @@
+"""
+Prompt Budget
+Keeps LLM prompts within a token budget so latency and cost stay flat as
+conversations and queues grow.
+
+Tokens are counted locally with tiktoken when it is installed, otherwise with a
+~4 characters per token estimate. Long conversations keep their newest turns
+verbatim and fold older turns into a rolling summary that is cached per
+conversation and extended incrementally, so each turn only condenses the turns
+that just left the window (no extra LLM call).
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional
+    _ENCODING = None
+
+# Tokens added per chat message for role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens in text"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    """Number of tokens a list of chat messages uses in a prompt"""
+    return sum(count_tokens(msg.get("content")) + MESSAGE_OVERHEAD_TOKENS for msg in messages) + 2
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "...") -> str:
+    """Cut text down to at most max_tokens tokens, ending with marker when cut"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        return _ENCODING.decode(tokens[:max(max_tokens - 1, 0)]) + marker
+    return text[:max(max_tokens * 4 - len(marker), 0)] + marker
+
+
+def condense_turn(role_label: str, content: str, max_tokens: int = 40) -> str:
+    """One summary line for a turn: its first sentence, capped at max_tokens"""
+    content = " ".join((content or "").split())
+    first_sentence = content.split(". ")[0]
+    return f"{role_label}: {truncate_to_tokens(first_sentence, max_tokens)}"
+
+
+class RollingSummaryCache:
+    """
+    Per-conversation rolling summaries of turns that fell out of the verbatim window.
+
+    Each entry remembers how many turns it covers; when more turns are folded in,
+    only the new ones are condensed and appended, then the oldest summary lines are
+    dropped to stay within the summary budget.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summarize(self, key: Optional[str], turns: List[Tuple[str, str]], max_tokens: int) -> str:
+        """
+        Summary of turns (a list of (role_label, content)) within max_tokens.
+        key identifies the conversation; pass None to skip caching.
+        """
+        with self._lock:
+            covered, lines = self._entries.get(key, (0, [])) if key else (0, [])
+            if covered > len(turns):
+                # History was rewritten (e.g. session reset) - start over
+                covered, lines = 0, []
+            lines = lines + [condense_turn(label, content) for label, content in turns[covered:]]
+            while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+                lines.pop(0)
+            if key:
+                self._entries[key] = (len(turns), lines)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return truncate_to_tokens("\n".join(lines), max_tokens)
+
+    def forget(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+# Shared cache of rolling summaries
+summary_cache = RollingSummaryCache()
+
+
+def window_turns(turns: List[Tuple[str, str]], summary_key: Optional[str] = None,
+                 keep_last: Optional[int] = None,
+                 summary_tokens: Optional[int] = None) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Split (role_label, content) turns into a rolling summary of the older turns
+    and the newest keep_last turns kept verbatim. The summary is None when
+    every turn fits in the window.
+    """
+    keep_last = Config.LLM_PROMPT_KEEP_TURNS if keep_last is None else keep_last
+    summary_tokens = Config.LLM_PROMPT_SUMMARY_TOKENS if summary_tokens is None else summary_tokens
+    if len(turns) <= keep_last:
+        return None, list(turns)
+    split = len(turns) - keep_last
+    summary = summary_cache.summarize(summary_key, turns[:split], summary_tokens)
+    return summary, list(turns[split:])
+
+
+def enforce_message_budget(messages: List[Dict], max_tokens: Optional[int] = None) -> List[Dict]:
+    """
+    Hard per-call cap. Drops the oldest history messages (keeping the leading
+    system message(s) and the final message) until the prompt fits, then
+    truncates the longest remaining message if it still does not.
+    """
+    max_tokens = Config.LLM_PROMPT_TOKEN_BUDGET if max_tokens is None else max_tokens
+    messages = [dict(msg) for msg in messages]
+    if count_message_tokens(messages) <= max_tokens:
+        return messages
+
+    leading = 0
+    while leading < len(messages) - 1 and messages[leading].get("role") == "system":
+        leading += 1
+    while len(messages) - leading > 1 and count_message_tokens(messages) > max_tokens:
+        del messages[leading]
+
+    overflow = count_message_tokens(messages) - max_tokens
+    if overflow > 0:
+        longest = max(messages, key=lambda msg: count_tokens(msg.get("content")))
+        longest["content"] = truncate_to_tokens(
+            longest.get("content", ""), count_tokens(longest.get("content")) - overflow
+        )
+    return messages
+
+
+def fit_blocks(blocks: List[str], max_tokens: int) -> Tuple[List[str], int]:
+    """
+    Keep blocks in order while they fit in max_tokens.
+    Returns the kept blocks and how many were left out.
+    """
+    kept = []
+    used = 0
+    for block in blocks:
+        cost = count_tokens(block) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(block)
+        used += cost
+    return kept, len(blocks) - len(kept)
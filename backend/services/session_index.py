@@ -0,0 +1,276 @@
+"""
+Session Index
+Maintained manifest of triage sessions so listings don't glob and parse every conversation.
+
+The manifest maps user_id -> session ids and keeps a small summary entry per session
+(created_at, status, symptom, triage level, recommended doctor). Summary fields are
+materialized at write time by the triage agent (see summary_for_user_turn and
+summary_for_bot_turn), so listings never walk messages. It is persisted as an
+append-only JSONL file: every change appends the updated entry (or a tombstone), and
+the file is rewritten when it grows well past the number of live entries. If the
+manifest is missing it is rebuilt from the conversation logs on disk; otherwise it is
+checked against them on first load (sessions whose logs are gone are dropped, logs
+missing from the manifest are added).
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from pathlib import Path
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.logger import logger
+from services.conversation_log import conversation_log, ConversationLog
+
+# Paths - the manifest lives next to the conversations folder
+DATA_DIR = backend_path / "data"
+PATIENT_DIR = DATA_DIR / "patient"
+PATIENT_DIR.mkdir(parents=True, exist_ok=True)
+
+SESSION_MANIFEST_FILE = PATIENT_DIR / "session_manifest.jsonl"
+
+ENTRY_FIELDS = ["session_id", "user_id", "created_at", "status", "symptom", "triage_level", "recommended_doctor"]
+
+
+class SessionIndex:
+    """In-memory session manifest backed by an append-only file"""
+
+    def __init__(self, manifest_path: Path = SESSION_MANIFEST_FILE, log: ConversationLog = conversation_log):
+        self.manifest_path = Path(manifest_path)
+        self.log = log
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._by_user: Dict[Optional[str], set] = {}
+        self._record_count = 0
+        self._signature = None
+        self._reconciled = False
+
+    def _current_signature(self):
+        try:
+            stat = self.manifest_path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _apply(self, record: Dict):
+        """Apply one manifest record to the in-memory index"""
+        session_id = record.get("session_id")
+        if not session_id:
+            return
+        previous = self._entries.get(session_id)
+        if previous is not None:
+            self._by_user.get(previous.get("user_id"), set()).discard(session_id)
+        if record.get("deleted"):
+            self._entries.pop(session_id, None)
+            return
+        entry = {field: record.get(field) for field in ENTRY_FIELDS}
+        self._entries[session_id] = entry
+        self._by_user.setdefault(entry.get("user_id"), set()).add(session_id)
+
+    def _ensure_loaded(self):
+        """Load the manifest on first use, or reload it if another process changed it"""
+        signature = self._current_signature()
+        if self._signature is not None and signature == self._signature:
+            return
+        if signature is None:
+            self.rebuild()
+            self._reconciled = True
+            return
+        self._entries = {}
+        self._by_user = {}
+        self._record_count = 0
+        with open(self.manifest_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                    self._record_count += 1
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed record in {self.manifest_path}")
+        self._signature = signature
+        if not self._reconciled:
+            self._reconciled = True
+            self._reconcile()
+
+    def _reconcile(self):
+        """Match the loaded manifest to the conversation logs on disk"""
+        on_disk = set(self.log.session_ids())
+        orphans = [session_id for session_id in self._entries if session_id not in on_disk]
+        for session_id in orphans:
+            self._apply({"session_id": session_id, "deleted": True})
+        added = 0
+        for session_id in on_disk - set(self._entries):
+            try:
+                conversation = self.log.load(session_id)
+            except Exception as e:
+                logger.warning(f"Error loading conversation {session_id}: {e}")
+                continue
+            if conversation:
+                self._apply(self.entry_from_conversation(conversation))
+                added += 1
+        if orphans or added:
+            logger.info(f"Session manifest: dropped {len(orphans)} sessions without conversation logs "
+                        f"({', '.join(orphans) or 'none'}), added {added} missing sessions")
+            self._write_snapshot()
+
+    def _append(self, record: Dict):
+        payload = (json.dumps(record) + "\n").encode("utf-8")
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        self._record_count += 1
+        self._signature = self._current_signature()
+        if self._record_count > 2 * max(len(self._entries), 50):
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Rewrite the manifest with one record per live session"""
+        tmp_path = self.manifest_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self._entries.values()))
+        os.replace(tmp_path, self.manifest_path)
+        self._record_count = len(self._entries)
+        self._signature = self._current_signature()
+
+    def rebuild(self):
+        """Rebuild the manifest from the conversation logs on disk"""
+        with self._lock:
+            self._entries = {}
+            self._by_user = {}
+            for session_id in self.log.session_ids():
+                try:
+                    conversation = self.log.load(session_id)
+                except Exception as e:
+                    logger.warning(f"Error loading conversation {session_id}: {e}")
+                    continue
+                if conversation:
+                    self._apply(self.entry_from_conversation(conversation))
+            self._write_snapshot()
+            logger.info(f"Rebuilt session manifest with {len(self._entries)} sessions")
+
+    @staticmethod
+    def entry_from_conversation(conversation: Dict) -> Dict:
+        """Build a manifest entry from a full conversation (used for new sessions and rebuilds)"""
+        entry = {
+            "session_id": conversation.get("session_id"),
+            "user_id": conversation.get("user_id"),
+            "created_at": conversation.get("created_at"),
+            "status": conversation.get("status", "active"),
+            "symptom": None,
+            "triage_level": None,
+            "recommended_doctor": None,
+        }
+        messages = conversation.get("messages", [])
+        for msg in messages:
+            if msg.get("type") == "user":
+                entry.update(summary_for_user_turn(entry, msg.get("content", "")))
+                break
+        for msg in reversed(messages):
+            if msg.get("type") == "bot":
+                entry.update(summary_for_bot_turn(entry, msg.get("metadata") or {}))
+                break
+        issue = (conversation.get("collected_info") or {}).get("issue")
+        if issue:
+            entry["symptom"] = issue
+        return entry
+
+    def upsert(self, entry: Dict):
+        """Insert or replace a session entry"""
+        with self._lock:
+            self._ensure_loaded()
+            self._apply(entry)
+            self._append(self._entries[entry["session_id"]])
+
+    def update(self, session_id: str, **fields):
+        """Update fields on an existing entry; unknown sessions are ignored"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            updated = {**entry, **{k: v for k, v in fields.items() if k in ENTRY_FIELDS}}
+            if updated == entry:
+                return
+            self._apply(updated)
+            self._append(updated)
+
+    def remove(self, session_id: str):
+        """Remove a session from the manifest"""
+        with self._lock:
+            self._ensure_loaded()
+            if session_id in self._entries:
+                self._apply({"session_id": session_id, "deleted": True})
+                self._append({"session_id": session_id, "deleted": True})
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(session_id)
+            return dict(entry) if entry else None
+
+    def session_ids(self, user_id: Optional[str] = None) -> List[str]:
+        """Session ids for one user, or every session when user_id is None"""
+        with self._lock:
+            self._ensure_loaded()
+            if user_id is None:
+                return list(self._entries.keys())
+            return list(self._by_user.get(user_id, set()))
+
+    def list_entries(self, user_id: Optional[str] = None) -> List[Dict]:
+        """Manifest entries for one user, or every session when user_id is None"""
+        with self._lock:
+            return [dict(self._entries[session_id]) for session_id in self.session_ids(user_id)]
+
+
+def triage_level_from_pain_rating(pain_rating) -> Optional[str]:
+    """Map a 1-10 pain rating to the low/medium/high triage level shown in session lists"""
+    if not pain_rating:
+        return None
+    try:
+        rating = int(pain_rating)
+    except (ValueError, TypeError):
+        return None
+    if rating <= 3:
+        return "low"
+    elif rating <= 6:
+        return "medium"
+    return "high"
+
+
+def summary_for_user_turn(entry: Dict, content: str) -> Dict:
+    """
+    Summary fields to record for a user message: until the issue is collected,
+    the first user message stands in as the session's symptom.
+    """
+    if entry.get("symptom"):
+        return {}
+    return {"symptom": content[:50] + "..." if len(content) > 50 else content}
+
+
+def summary_for_bot_turn(entry: Dict, metadata: Dict) -> Dict:
+    """
+    Summary fields to record for a bot message. Triage level and recommended
+    doctor always reflect the latest bot turn; the collected issue overrides
+    any symptom taken from the first user message.
+    """
+    fields = {}
+    collected_info = metadata.get("collected_info") or {}
+    if collected_info.get("issue"):
+        fields["symptom"] = collected_info["issue"]
+    fields["triage_level"] = triage_level_from_pain_rating(collected_info.get("pain_rating"))
+    doctor = metadata.get("recommended_doctor")
+    fields["recommended_doctor"] = doctor.get("name", "") if doctor else None
+    if metadata.get("is_complete"):
+        fields["status"] = "completed"
+    return fields
+
+
+# Shared session index used by the triage agent and summary service
+session_index = SessionIndex()
@@ -0,0 +1,215 @@
+"""
+Slot Engine
+Per-doctor interval index of booked appointment times, used to reserve slots atomically
+and to answer availability queries without scanning every appointment.
+
+Each doctor has sorted lists of booking starts/ends; every booking lasts
+Config.APPOINTMENT_SLOT_MINUTES, so ends are sorted too and a conflict check is a
+single bisect plus a look at the preceding booking. Bookings are derived from the
+appointment repository (cancelled appointments don't hold a slot) and rebuilt
+whenever the repository reloads; the offered slots come from doctors.json.
+"""
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config.config import Config
+from adapters.logger import logger
+from services.appointment_repository import appointment_repository
+from utils import parse_appointment_datetime
+
+DOCTOR_DATA_FILE = backend_path / "data" / "doctor" / "doctors.json"
+
+# Appointment statuses that don't occupy a slot
+FREE_STATUSES = {"cancelled"}
+
+
+class SlotUnavailableError(Exception):
+    """Raised when a slot overlaps an existing booking for the doctor"""
+
+
+class DoctorSchedule:
+    """Sorted bookings of one doctor (parallel lists, ordered by start time)"""
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.holders: List[str] = []
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        # Bookings starting before `end` are [0, i); the one ending last is i - 1
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def add(self, start: datetime, end: datetime, holder: str):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.holders.insert(i, holder)
+
+    def remove(self, start: datetime, holder: str) -> bool:
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.holders[i] == holder:
+                del self.starts[i], self.ends[i], self.holders[i]
+                return True
+            i += 1
+        return False
+
+
+class SlotEngine:
+    """
+    Atomic slot reservation across doctors.
+
+    A reservation is held by an appointment id. reserve() raises SlotUnavailableError
+    on overlap; callers release() the slot if saving the appointment fails, or
+    confirm() it once the appointment is stored. All operations run under one lock
+    and are O(log n) in the doctor's number of bookings (plus list inserts).
+    """
+
+    def __init__(self, slot_minutes: int = Config.APPOINTMENT_SLOT_MINUTES):
+        self.slot_length = timedelta(minutes=slot_minutes)
+        self._lock = threading.RLock()
+        self._generation = None
+        self._schedules: Dict[str, DoctorSchedule] = {}
+        self._holders: Dict[str, Tuple[str, datetime]] = {}
+        # Reservations whose appointment isn't saved yet; kept across rebuilds
+        self._pending: Dict[str, Tuple[str, datetime]] = {}
+        self._offered_signature = None
+        self._offered: Dict[str, Tuple[List[datetime], List[Dict]]] = {}
+
+    def _sync(self):
+        """Rebuild the bookings from the appointment repository if it reloaded"""
+        generation = appointment_repository.generation()
+        if generation == self._generation:
+            return
+        self._schedules = {}
+        self._holders = {}
+        for apt in appointment_repository.all():
+            if apt.get("status") in FREE_STATUSES:
+                continue
+            start = parse_appointment_datetime(apt.get("appointment_date"), apt.get("appointment_time"))
+            if start is None or not apt.get("appointment_id"):
+                continue
+            # Existing double bookings are kept as they are
+            self._insert(apt.get("doctor_id"), start, apt["appointment_id"])
+        for holder, (doctor_id, start) in self._pending.items():
+            if holder not in self._holders:
+                self._insert(doctor_id, start, holder)
+        self._generation = generation
+
+    def _insert(self, doctor_id: str, start: datetime, holder: str):
+        schedule = self._schedules.setdefault(doctor_id, DoctorSchedule())
+        schedule.add(start, start + self.slot_length, holder)
+        self._holders[holder] = (doctor_id, start)
+
+    def _load_offered(self):
+        """Offered slots per doctor from doctors.json, reloaded when the file changes"""
+        try:
+            stat = DOCTOR_DATA_FILE.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._offered_signature:
+            return
+        offered: Dict[str, Tuple[List[datetime], List[Dict]]] = {}
+        try:
+            with open(DOCTOR_DATA_FILE, 'r') as f:
+                doctors = json.load(f).get("doctors", [])
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading doctor slots: {e}")
+            doctors = []
+        for doctor in doctors:
+            slots = []
+            for slot in doctor.get("available_slots", []):
+                start = parse_appointment_datetime(slot.get("date"), slot.get("time"))
+                if start is not None:
+                    slots.append((start, slot))
+            slots.sort(key=lambda item: item[0])
+            offered[doctor.get("id")] = ([start for start, _ in slots], [slot for _, slot in slots])
+        self._offered = offered
+        self._offered_signature = signature
+
+    def reserve(self, doctor_id: str, start: datetime, holder: str):
+        """Reserve the slot starting at `start` for holder (idempotent per holder)"""
+        end = start + self.slot_length
+        with self._lock:
+            self._sync()
+            current = self._holders.get(holder)
+            if current == (doctor_id, start):
+                return
+            was_pending = holder in self._pending
+            if current is not None:
+                self._release(holder)
+            schedule = self._schedules.setdefault(doctor_id, DoctorSchedule())
+            if not schedule.is_free(start, end):
+                if current is not None:
+                    self._insert(*current, holder)
+                    if was_pending:
+                        self._pending[holder] = current
+                raise SlotUnavailableError(f"Doctor {doctor_id} is already booked at {start.isoformat()}")
+            self._insert(doctor_id, start, holder)
+            self._pending[holder] = (doctor_id, start)
+
+    def confirm(self, holder: str):
+        """Mark a reservation as backed by a saved appointment"""
+        with self._lock:
+            self._pending.pop(holder, None)
+
+    def release(self, holder: str) -> bool:
+        """Free the slot held by holder; False if it held none"""
+        with self._lock:
+            self._sync()
+            return self._release(holder)
+
+    def _release(self, holder: str) -> bool:
+        self._pending.pop(holder, None)
+        current = self._holders.pop(holder, None)
+        if current is None:
+            return False
+        doctor_id, start = current
+        return self._schedules[doctor_id].remove(start, holder)
+
+    def is_available(self, doctor_id: str, start: datetime) -> bool:
+        with self._lock:
+            self._sync()
+            schedule = self._schedules.get(doctor_id)
+            return schedule is None or schedule.is_free(start, start + self.slot_length)
+
+    def slots_for_doctor(self, doctor_id: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> List[Dict]:
+        """
+        Offered slots of a doctor in [start, end), each with "available" set to
+        False when the slot is marked unavailable or overlaps a booking
+        """
+        with self._lock:
+            self._sync()
+            self._load_offered()
+            starts, offered = self._offered.get(doctor_id, ([], []))
+            lo = bisect_left(starts, start) if start else 0
+            hi = bisect_left(starts, end) if end else len(starts)
+            schedule = self._schedules.get(doctor_id)
+            slots = []
+            for slot_start, slot in zip(starts[lo:hi], offered[lo:hi]):
+                free = schedule is None or schedule.is_free(slot_start, slot_start + self.slot_length)
+                slots.append({**slot, "available": bool(slot.get("available", True)) and free})
+            return slots
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "doctors": len(self._schedules),
+                "bookings": len(self._holders),
+                "pending": len(self._pending),
+            }
+
+
+# Shared slot engine used by booking and doctor recommendations
+slot_engine = SlotEngine()
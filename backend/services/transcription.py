@@ -0,0 +1,71 @@
+"""
+Recording Transcription
+Transcribes consultation recordings through the configured speech-to-text backend.
+
+PCM WAV recordings are split at pauses (services/audio_segmenter.py) and every
+segment except pure digital silence is transcribed concurrently on the
+transcription worker pool, then stitched back together in order. Wall-clock time
+therefore drops with Config.TRANSCRIPTION_WORKERS. Other formats are transcribed as one piece.
+"""
+import asyncio
+import tempfile
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import sys
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.logger import logger
+from adapters.speech_to_text import SpeechToTextBackend, get_stt_backend, get_transcription_pool
+from services.audio_segmenter import split_wav
+
+
+async def _transcribe_file(backend: SpeechToTextBackend, path: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_transcription_pool(), backend.transcribe_file, path)
+
+
+async def transcribe_recording(audio_file_path: str, backend: Optional[SpeechToTextBackend] = None) -> Dict:
+    """
+    Transcribe a recording.
+
+    Returns {"transcript": full text, "segments": [{"start", "end", "text"}, ...]}
+    with segment times in seconds from the start of the recording.
+    """
+    backend = backend or get_stt_backend()
+    loop = asyncio.get_running_loop()
+
+    with tempfile.TemporaryDirectory(prefix="transcription_") as segment_dir:
+        try:
+            # Reading the recording and writing the segments is blocking file and numpy work
+            segments = await loop.run_in_executor(
+                get_transcription_pool(), split_wav, audio_file_path, Path(segment_dir)
+            )
+        except (wave.Error, ValueError, EOFError) as e:
+            # Not a PCM WAV file; let the backend handle it as a whole
+            logger.info(f"Transcribing {audio_file_path} without segmentation: {e!r}")
+            segments = []
+
+        if len(segments) <= 1:
+            text = await _transcribe_file(backend, audio_file_path)
+            end = segments[0]["end"] if segments else None
+            return {"transcript": text, "segments": [{"start": 0.0, "end": end, "text": text}]}
+
+        audible_segments = [segment for segment in segments if segment["audible"]]
+        for segment in segments:
+            if not segment["audible"]:
+                logger.info(f"Skipping digital silence in {audio_file_path} "
+                            f"({segment['start']}s-{segment['end']}s)")
+        logger.info(f"Transcribing {audio_file_path} as {len(audible_segments)} segments")
+        texts: List[str] = await asyncio.gather(*[
+            _transcribe_file(backend, str(segment["path"])) for segment in audible_segments
+        ])
+
+    results = [
+        {"start": segment["start"], "end": segment["end"], "text": (text or "").strip()}
+        for segment, text in zip(audible_segments, texts)
+    ]
+    transcript = " ".join(result["text"] for result in results if result["text"])
+    return {"transcript": transcript, "segments": results}
@@ -5,7 +5,7 @@ Implements a React-based agent that asks questions and collects patient informat
 import json
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from pathlib import Path
 
 import sys
@@ -15,7 +15,14 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from adapters.azure_openai import AzureOpenAIHelper
+from adapters.azure_openai import get_llm, PRIORITY_INTERACTIVE
+from services.conversation_log import conversation_log
+from services.patient_context import PatientContext
+from services.json_stream import JSONStringFieldStreamer
+from services.triage_extractor import extract_duration, extract_pain_rating, severity_from_pain_rating
+from services.prompt_budget import SUMMARY_PREFIX, enforce_message_budget, summary_cache, window_turns
+from services.session_index import session_index, summary_for_user_turn, summary_for_bot_turn
+from services.slot_engine import slot_engine
 
 # Try different logger import paths
 try:
@@ -47,6 +54,9 @@ DOCTOR_DATA_FILE = DOCTOR_DIR / "doctors.json"
 CONVERSATIONS_DIR = PATIENT_DIR / "conversations"
 CONVERSATIONS_DIR.mkdir(exist_ok=True)
 
+# Templated follow-up question (same wording as the system prompt), used by the local fast path
+DURATION_QUESTION = "How long have you been experiencing this? When did it start?"
+
 
 class TriageAgent:
     """
@@ -55,7 +65,7 @@ class TriageAgent:
     """
     
     def __init__(self):
-        self.llm = AzureOpenAIHelper()
+        self.llm = get_llm()
         self.doctor_data = self._load_doctor_data()
     
     def _load_doctor_data(self) -> Dict:
@@ -105,8 +115,13 @@ Rules:
 - When all three pieces of information are collected, set "is_complete": true and "type": "recommendation"
 - Be empathetic and professional in your communication"""
     
-    def _build_messages(self, conversation_history: List[Dict], current_user_message: str, current_collected_info: Dict) -> List[Dict]:
-        """Build messages for LLM including system prompt and conversation history"""
+    def _build_messages(self, conversation_history: List[Dict], current_user_message: str, current_collected_info: Dict,
+                        session_id: Optional[str] = None) -> List[Dict]:
+        """
+        Build messages for LLM including system prompt and conversation history.
+        Only the newest turns are sent verbatim; older ones are folded into a
+        rolling summary and the prompt is capped at Config.LLM_PROMPT_TOKEN_BUDGET.
+        """
         # Enhanced system prompt with current state
         system_prompt = self._get_system_prompt()
         system_prompt += f"\n\nCurrent collected information:\n- Issue: {current_collected_info.get('issue', 'Not collected')}\n- Pain Rating (1-10): {current_collected_info.get('pain_rating', 'Not collected')}\n- Duration: {current_collected_info.get('duration', 'Not collected')}"
@@ -116,16 +131,23 @@ Rules:
         ]
         
         # Add conversation history (skip initial greeting)
+        turns = []
         for msg in conversation_history[1:]:  # Skip first bot message
             if msg.get("type") == "user":
-                messages.append({"role": "user", "content": msg.get("content", "")})
+                turns.append(("Patient", msg.get("content", "")))
             elif msg.get("type") == "bot":
-                messages.append({"role": "assistant", "content": msg.get("content", "")})
+                turns.append(("Assistant", msg.get("content", "")))
+        
+        summary, recent_turns = window_turns(turns, summary_key=session_id)
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+        for label, content in recent_turns:
+            messages.append({"role": "user" if label == "Patient" else "assistant", "content": content})
         
         # Add current user message
         messages.append({"role": "user", "content": current_user_message})
         
-        return messages
+        return enforce_message_budget(messages)
     
     def _parse_llm_response(self, response: str) -> Dict:
         """Parse LLM JSON response"""
@@ -164,26 +186,66 @@ Rules:
         
         try:
             rating = int(pain_rating)
-            if rating <= 3:
-                return "mild"
-            elif rating <= 6:
-                return "moderate"
-            elif rating <= 8:
-                return "severe"
-            else:
-                return "critical"
         except (ValueError, TypeError):
             # If not a number, try to parse
-            rating_str = str(pain_rating).lower()
-            if any(word in rating_str for word in ["1", "2", "3", "mild", "low"]):
-                return "mild"
-            elif any(word in rating_str for word in ["4", "5", "6", "moderate", "medium"]):
+            rating = extract_pain_rating(str(pain_rating))
+            if rating is None:
                 return "moderate"
-            elif any(word in rating_str for word in ["7", "8", "severe", "high"]):
-                return "severe"
-            elif any(word in rating_str for word in ["9", "10", "critical", "extreme", "worst"]):
-                return "critical"
-            return "moderate"
+        return severity_from_pain_rating(rating)
+    
+    def _fast_path_response(self, user_message: str, current_collected_info: Dict) -> Optional[Dict]:
+        """
+        Answer pain rating / duration turns locally, without the LLM.
+        
+        Once the issue is known the agent asks for the pain rating, then the duration.
+        If the reply to the pending question can be extracted deterministically, the
+        collected info is updated and the next templated question (or the completion
+        flag) is returned in the same shape as an LLM response. Returns None when the
+        reply needs the LLM (no issue yet, or nothing unambiguous extracted).
+        """
+        if not current_collected_info.get("issue"):
+            return None
+        
+        collected_info = {
+            "issue": current_collected_info.get("issue"),
+            "pain_rating": current_collected_info.get("pain_rating"),
+            "duration": current_collected_info.get("duration")
+        }
+        if not collected_info["pain_rating"]:
+            rating = extract_pain_rating(user_message)
+            if rating is None:
+                return None
+            collected_info["pain_rating"] = str(rating)
+            # Patients often answer both at once ("about 7, for 3 days")
+            collected_info["duration"] = collected_info["duration"] or extract_duration(user_message)
+        elif not collected_info["duration"]:
+            duration = extract_duration(user_message)
+            if duration is None:
+                return None
+            collected_info["duration"] = duration
+        else:
+            return None
+        
+        if not collected_info["duration"]:
+            return {
+                "type": "question",
+                "message": f"Thank you. {DURATION_QUESTION}",
+                "question_type": "duration",
+                "collected_info": collected_info,
+                "is_complete": False
+            }
+        # Everything is collected; _finalize_response replaces this with the recommendation
+        return {
+            "type": "recommendation",
+            "message": "Thank you for the information.",
+            "question_type": None,
+            "collected_info": collected_info,
+            "is_complete": True
+        }
+    
+    def needs_llm(self, user_message: str, current_collected_info: Dict) -> bool:
+        """False when the turn is answered by the local fast path"""
+        return self._fast_path_response(user_message, current_collected_info) is None
     
     def _recommend_doctor(self, collected_info: Dict) -> Dict:
         """Recommend appropriate doctor based on collected information"""
@@ -211,9 +273,16 @@ Rules:
         if not recommended_doctor and self.doctor_data.get("doctors"):
             recommended_doctor = self.doctor_data["doctors"][0]
         
+        # Mark slots that are already booked as unavailable
+        if recommended_doctor:
+            recommended_doctor = {
+                **recommended_doctor,
+                "available_slots": slot_engine.slots_for_doctor(recommended_doctor.get("id"))
+            }
+        
         return recommended_doctor
     
-    def process_message(self, session_id: str, user_message: str, conversation_history: List[Dict], current_collected_info: Dict) -> Dict:
+    async def process_message(self, session_id: str, user_message: str, conversation_history: List[Dict], current_collected_info: Dict) -> Dict:
         """
         Process a user message and return agent response
         
@@ -227,40 +296,102 @@ Rules:
             Dict with agent response and updated state
         """
         try:
+            # Pain rating and duration answers are extracted locally when possible
+            fast_response = self._fast_path_response(user_message, current_collected_info)
+            if fast_response is not None:
+                return self._finalize_response(fast_response, current_collected_info)
+            
             # Build messages for LLM
-            messages = self._build_messages(conversation_history, user_message, current_collected_info)
+            messages = self._build_messages(conversation_history, user_message, current_collected_info, session_id)
             
             # Get LLM response in JSON mode
-            llm_response = self.llm.get_response(messages, json_mode=True)
+            llm_response = await self.llm.get_response(messages, json_mode=True, priority=PRIORITY_INTERACTIVE)
             
             # Parse response
             parsed_response = self._parse_llm_response(llm_response)
             
-            # Extract collected info from response and merge with current
-            new_collected_info = parsed_response.get("collected_info", {})
-            collected_info = {**current_collected_info}
+            return self._finalize_response(parsed_response, current_collected_info)
+            
+        except Exception as e:
+            logger.error(f"Error processing message: {e}", exc_info=True)
+            return self._error_result(e)
+    
+    def _error_result(self, error: Exception) -> Dict:
+        """Result returned when a turn could not be processed"""
+        return {
+            "success": False,
+            "error": str(error),
+            "response": {
+                "type": "question",
+                "message": "I apologize, but I encountered an error. Please try again.",
+                "question_type": None,
+                "collected_info": {},
+                "is_complete": False
+            }
+        }
+    
+    async def stream_message(self, session_id: str, user_message: str, conversation_history: List[Dict], current_collected_info: Dict) -> AsyncIterator[Dict]:
+        """
+        Streaming variant of process_message.
+        
+        Yields {"type": "delta", "content": str} events with the agent's `message`
+        text as it is generated (parsed incrementally from the JSON stream), then a
+        single {"type": "result", "result": Dict} event shaped like process_message's
+        return value. collected_info and the doctor recommendation are applied only
+        once the JSON object is complete, so the final message may differ from the
+        streamed text (e.g. when it is replaced by the recommendation).
+        """
+        try:
+            fast_response = self._fast_path_response(user_message, current_collected_info)
+            if fast_response is not None:
+                result = self._finalize_response(fast_response, current_collected_info)
+                yield {"type": "delta", "content": result["response"]["message"]}
+                yield {"type": "result", "result": result}
+                return
+            
+            messages = self._build_messages(conversation_history, user_message, current_collected_info, session_id)
+            streamer = JSONStringFieldStreamer("message")
+            chunks = []
+            async for chunk in self.llm.stream_chat_response(messages, json_mode=True):
+                chunks.append(chunk)
+                delta = streamer.feed(chunk)
+                if delta:
+                    yield {"type": "delta", "content": delta}
             
-            # Update collected info with new information
-            for key in ["issue", "pain_rating", "duration"]:
-                if new_collected_info.get(key) and new_collected_info[key] not in [None, "null", ""]:
-                    collected_info[key] = new_collected_info[key]
+            parsed_response = self._parse_llm_response("".join(chunks))
+            yield {"type": "result", "result": self._finalize_response(parsed_response, current_collected_info)}
             
-            # Check if all info is collected
-            is_complete = all([
-                collected_info.get("issue"),
-                collected_info.get("pain_rating"),
-                collected_info.get("duration")
-            ])
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}", exc_info=True)
+            yield {"type": "result", "result": self._error_result(e)}
+    
+    def _finalize_response(self, parsed_response: Dict, current_collected_info: Dict) -> Dict:
+        """Merge the parsed LLM response into the collected info and add a doctor recommendation when complete"""
+        # Extract collected info from response and merge with current
+        new_collected_info = parsed_response.get("collected_info", {})
+        collected_info = {**current_collected_info}
+        
+        # Update collected info with new information
+        for key in ["issue", "pain_rating", "duration"]:
+            if new_collected_info.get(key) and new_collected_info[key] not in [None, "null", ""]:
+                collected_info[key] = new_collected_info[key]
+        
+        # Check if all info is collected
+        is_complete = all([
+            collected_info.get("issue"),
+            collected_info.get("pain_rating"),
+            collected_info.get("duration")
+        ])
+        
+        # If all info is collected, recommend doctor
+        if is_complete:
+            parsed_response["is_complete"] = True
+            parsed_response["type"] = "recommendation"
+            recommended_doctor = self._recommend_doctor(collected_info)
             
-            # If all info is collected, recommend doctor
-            if is_complete:
-                parsed_response["is_complete"] = True
-                parsed_response["type"] = "recommendation"
-                recommended_doctor = self._recommend_doctor(collected_info)
-                
-                if recommended_doctor:
-                    # Format recommendation message
-                    recommendation_message = f"""Based on your symptoms, I recommend consulting with {recommended_doctor['name']}, a {recommended_doctor['specialty']}.
+            if recommended_doctor:
+                # Format recommendation message
+                recommendation_message = f"""Based on your symptoms, I recommend consulting with {recommended_doctor['name']}, a {recommended_doctor['specialty']}.
 
 **Doctor Details:**
 - Name: {recommended_doctor['name']}
@@ -271,34 +402,20 @@ Rules:
 
 **Available Appointment Slots:**
 """
-                    for slot in recommended_doctor.get("available_slots", [])[:3]:
-                        if slot.get("available"):
-                            recommendation_message += f"- {slot['date']} at {slot['time']}\n"
-                    
-                    parsed_response["message"] = recommendation_message
-                    parsed_response["recommended_doctor"] = recommended_doctor
-                else:
-                    parsed_response["message"] = "I recommend consulting with a healthcare professional. Please visit our appointment booking page to schedule a consultation."
-            
-            return {
-                "success": True,
-                "response": parsed_response,
-                "collected_info": collected_info
-            }
-            
-        except Exception as e:
-            logger.error(f"Error processing message: {e}", exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-                "response": {
-                    "type": "question",
-                    "message": "I apologize, but I encountered an error. Please try again.",
-                    "question_type": None,
-                    "collected_info": {},
-                    "is_complete": False
-                }
-            }
+                for slot in recommended_doctor.get("available_slots", [])[:3]:
+                    if slot.get("available"):
+                        recommendation_message += f"- {slot['date']} at {slot['time']}\n"
+                
+                parsed_response["message"] = recommendation_message
+                parsed_response["recommended_doctor"] = recommended_doctor
+            else:
+                parsed_response["message"] = "I recommend consulting with a healthcare professional. Please visit our appointment booking page to schedule a consultation."
+        
+        return {
+            "success": True,
+            "response": parsed_response,
+            "collected_info": collected_info
+        }
     
     def start_session(self, user_id: Optional[str] = None) -> str:
         """
@@ -338,79 +455,86 @@ Rules:
             "status": "active"
         }
         
-        # Save conversation
+        # Save conversation and register it in the session manifest
         self._save_conversation(session_id, conversation)
+        try:
+            session_index.upsert(session_index.entry_from_conversation(conversation))
+        except Exception as e:
+            logger.error(f"Error updating session manifest: {e}", exc_info=True)
         
         return session_id
     
     def _save_conversation(self, session_id: str, conversation: Dict):
-        """Save conversation to file"""
+        """Save a new conversation to the conversation log"""
         try:
-            file_path = CONVERSATIONS_DIR / f"{session_id}.json"
-            with open(file_path, 'w') as f:
-                json.dump(conversation, f, indent=2)
+            conversation_log.create(conversation)
         except Exception as e:
             logger.error(f"Error saving conversation: {e}", exc_info=True)
     
     def _load_conversation(self, session_id: str) -> Optional[Dict]:
-        """Load conversation from file"""
+        """Load conversation from the conversation log"""
         try:
-            file_path = CONVERSATIONS_DIR / f"{session_id}.json"
-            if file_path.exists():
-                with open(file_path, 'r') as f:
-                    return json.load(f)
-            return None
+            return conversation_log.load(session_id)
         except Exception as e:
             logger.error(f"Error loading conversation: {e}", exc_info=True)
             return None
     
     def add_message(self, session_id: str, message_type: str, content: str, metadata: Optional[Dict] = None):
-        """Add a message to the conversation"""
-        conversation = self._load_conversation(session_id)
-        if not conversation:
-            logger.warning(f"Conversation {session_id} not found")
-            return
-        
+        """Append a message to the conversation log"""
         new_message = {
-            "id": len(conversation.get("messages", [])) + 1,
             "type": message_type,
             "content": content,
             "timestamp": datetime.now().isoformat(),
             "metadata": metadata or {}
         }
         
-        conversation["messages"].append(new_message)
-        
-        # Update collected info if provided
+        # Collected info and completion status are recorded as a state update
+        state = {}
         if metadata and "collected_info" in metadata:
-            conversation["collected_info"].update(metadata["collected_info"])
-        
-        # Update status if complete
+            state["collected_info"] = metadata["collected_info"]
         if metadata and metadata.get("is_complete"):
-            conversation["status"] = "completed"
+            state["status"] = "completed"
         
-        self._save_conversation(session_id, conversation)
+        try:
+            stored = conversation_log.append_message(session_id, new_message, state or None)
+        except Exception as e:
+            logger.error(f"Error saving message: {e}", exc_info=True)
+            return
+        if stored is None:
+            logger.warning(f"Conversation {session_id} not found")
+            return
+        
+        # Materialize the session summary (symptom, triage level, recommended doctor)
+        # now, so session listings never have to walk the messages
+        try:
+            entry = session_index.get(session_id) or {}
+            if message_type == "bot":
+                summary_fields = summary_for_bot_turn(entry, metadata or {})
+            else:
+                summary_fields = summary_for_user_turn(entry, content)
+            if summary_fields:
+                session_index.update(session_id, **summary_fields)
+        except Exception as e:
+            logger.error(f"Error updating session manifest: {e}", exc_info=True)
     
-    def get_conversation(self, session_id: str) -> Optional[Dict]:
-        """Get conversation by session ID"""
+    def get_conversation(self, session_id: str, context: Optional[PatientContext] = None) -> Optional[Dict]:
+        """Get conversation by session ID (served from the request's patient context when given)"""
+        if context is not None:
+            return context.conversation(session_id)
         return self._load_conversation(session_id)
     
     def get_all_sessions(self, user_id: Optional[str] = None) -> List[Dict]:
         """Get all conversations, optionally filtered by user_id"""
         sessions = []
         try:
-            if not CONVERSATIONS_DIR.exists():
-                return sessions
-            
-            for file_path in CONVERSATIONS_DIR.glob("*.json"):
+            # The session manifest narrows the load to this user's sessions
+            for session_id in session_index.session_ids(user_id):
                 try:
-                    with open(file_path, 'r') as f:
-                        conversation = json.load(f)
-                        # Filter by user_id if provided
-                        if user_id is None or conversation.get("user_id") == user_id:
-                            sessions.append(conversation)
+                    conversation = conversation_log.load(session_id)
+                    if conversation:
+                        sessions.append(conversation)
                 except Exception as e:
-                    logger.warning(f"Error loading conversation from {file_path}: {e}")
+                    logger.warning(f"Error loading conversation {session_id}: {e}")
                     continue
             
             return sessions
@@ -421,9 +545,9 @@ Rules:
     def delete_session(self, session_id: str) -> bool:
         """Delete a triage session by session ID"""
         try:
-            file_path = CONVERSATIONS_DIR / f"{session_id}.json"
-            if file_path.exists():
-                file_path.unlink()
+            if conversation_log.delete(session_id):
+                session_index.remove(session_id)
+                summary_cache.forget(session_id)
                 logger.info(f"Deleted session: {session_id}")
                 return True
             else:
@@ -0,0 +1,183 @@
+"""
+Triage Extractor
+Deterministic extraction of the pain rating and duration answers in a triage turn,
+so the common "rate your pain" / "how long" replies don't need an LLM round trip.
+
+Extractors return None whenever an answer is missing or ambiguous; the caller then
+falls back to the LLM.
+"""
+import re
+from typing import Optional
+
+# Pain rating ranges per severity level (shared with TriageAgent._get_severity_from_pain_rating)
+SEVERITY_LEVELS = [
+    ("mild", 1, 3),
+    ("moderate", 4, 6),
+    ("severe", 7, 8),
+    ("critical", 9, 10),
+]
+
+# Words patients use for each severity level
+SEVERITY_WORDS = {
+    "mild": ["mild", "low", "slight", "minor", "little"],
+    "moderate": ["moderate", "medium", "average", "manageable"],
+    "severe": ["severe", "high", "bad", "strong", "intense"],
+    "critical": ["critical", "extreme", "worst", "unbearable", "excruciating"],
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "a": 1, "an": 1, "a couple of": 2, "couple of": 2, "a couple": 2, "couple": 2,
+}
+
+DURATION_UNITS = {
+    "min": "minute", "mins": "minute", "minute": "minute", "minutes": "minute",
+    "hr": "hour", "hrs": "hour", "hour": "hour", "hours": "hour",
+    "day": "day", "days": "day",
+    "wk": "week", "wks": "week", "week": "week", "weeks": "week",
+    "month": "month", "months": "month",
+    "yr": "year", "yrs": "year", "year": "year", "years": "year",
+}
+
+_NUMBER = r"(\d+(?:\.\d+)?|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)"
+_UNIT = r"(" + "|".join(sorted(DURATION_UNITS, key=len, reverse=True)) + r")\b"
+
+_DURATION_RE = re.compile(
+    r"\b(?:(a few|few|several)|" + _NUMBER + r"(?:\s*(?:-|to|or)\s*" + _NUMBER + r")?|"
+    r"(a couple of|couple of|a couple|couple|an|a))\s*" + _UNIT
+)
+_RELATIVE_DURATIONS = [
+    (re.compile(r"\b(since|from)?\s*this (morning|afternoon|evening)\b"), "since this {1}"),
+    (re.compile(r"\b(since|from)?\s*(yesterday|last night|last week|last month|last year)\b"), "since {1}"),
+    (re.compile(r"\b(since|from)\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"), "since {1}"),
+    (re.compile(r"\b(today|just now|an hour ago)\b"), "{0}"),
+]
+
+# A duration that is really an age ("45 years old", "aged 45 years")
+_AGE_AFTER_RE = re.compile(r"\s*(?:old|of age)\b")
+_AGE_BEFORE_RE = re.compile(r"\b(?:aged?|age of)\s*$")
+
+# A rating candidate: a number or range, optionally "/10" or "out of 10". Candidates
+# are only taken as ratings with rating context, see _is_rating.
+_RATING_RE = re.compile(
+    r"(?<![\d.])\b" + _NUMBER + r"(?:\s*(?:-|to|or)\s*" + _NUMBER + r")?(?!\w|\.\d)"
+    r"(\s*(?:/|out of)\s*10\b)?"
+)
+# Words before a bare number that make it a rating ("pain is 7", "about 6", "it's a 7")
+_RATING_CUE_RE = re.compile(
+    r"(?:\b(?:pain|it|that|rating|level)(?:'s|\s+is)|\bits|\babout|\baround|\broughly|\bapproximately|"
+    r"\bmaybe|\bprobably|\blike|\bsay|\brate it(?:\s+at)?|\bgive it)\s+(?:an?\s+)?$"
+)
+# What may follow a bare rating; anything else ("2 tablets", "10 mean") is not a rating
+_RATING_END_RE = re.compile(
+    r"\s*(?:$|[,.;:!?)]|(?:and|but|so|or so|now|maybe|probably|i think|i guess|today|right now|ish)\b)"
+)
+_NOT_RATING_AFTER_RE = re.compile(r"\s*(?:" + _UNIT + r"|(?:am|pm|o'clock)\b)")
+_NEGATION_RE = re.compile(r"\b(not|no|never|isn't|wasn't|n't)\b")
+
+
+def _to_number(token: Optional[str]) -> Optional[float]:
+    if token is None:
+        return None
+    token = token.strip().lower()
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _is_age(text: str, match: re.Match) -> bool:
+    return bool(_AGE_AFTER_RE.match(text, match.end()) or _AGE_BEFORE_RE.search(text, 0, match.start()))
+
+
+def severity_from_pain_rating(rating: int) -> str:
+    """Severity level for a 1-10 pain rating"""
+    for level, low, high in SEVERITY_LEVELS:
+        if rating <= high:
+            return level
+    return SEVERITY_LEVELS[-1][0]
+
+
+def _is_rating(text: str, match: re.Match) -> bool:
+    """A rating candidate counts when it has a scale, is the whole reply, or has a rating cue"""
+    after = text[match.end():]
+    if _NOT_RATING_AFTER_RE.match(after):
+        return False
+    if match.group(3):
+        return True
+    if text.strip(" .!?,") == match.group(0):
+        return True
+    return bool(_RATING_CUE_RE.search(text, 0, match.start()) and _RATING_END_RE.match(after))
+
+
+def extract_pain_rating(text: str) -> Optional[int]:
+    """
+    Pain rating (1-10) from a reply such as "7", "about 6-7", "8/10", "pain is seven"
+    or "pretty severe". Ranges use the higher number and severity words use the top
+    of their range in SEVERITY_LEVELS. A number needs rating context, so "I took
+    2 tablets" or "what does 10 mean?" give None.
+    """
+    text = (text or "").lower()
+    # Numbers inside durations ("2 or 3 days", "45 years old") are never ratings
+    text = _DURATION_RE.sub(" ", text)
+    ratings = set()
+    for match in _RATING_RE.finditer(text):
+        if not _is_rating(text, match):
+            continue
+        numbers = [_to_number(match.group(1)), _to_number(match.group(2))]
+        rating = max(n for n in numbers if n is not None)
+        if rating != int(rating):
+            rating = int(rating) + 1
+        ratings.add(int(rating))
+
+    if ratings:
+        if len(ratings) > 1 or not 1 <= next(iter(ratings)) <= 10:
+            return None
+        return ratings.pop()
+
+    if _NEGATION_RE.search(text):
+        return None
+    levels = {
+        level
+        for level, words in SEVERITY_WORDS.items()
+        if any(re.search(rf"\b{word}\b", text) for word in words)
+    }
+    if len(levels) != 1:
+        return None
+    level = levels.pop()
+    return next(high for name, _, high in SEVERITY_LEVELS if name == level)
+
+
+def extract_duration(text: str) -> Optional[str]:
+    """
+    Duration from a reply such as "3 days", "a couple of weeks", "2-3 months" or
+    "since yesterday", normalized to a short phrase (e.g. "3 days"). Ages such as
+    "45 years old" are not durations.
+    """
+    text = (text or "").lower()
+    matches = [match for match in _DURATION_RE.finditer(text) if not _is_age(text, match)]
+    if len(matches) > 1:
+        return None
+    if matches:
+        match = matches[0]
+        few, first, second, article, unit = match.groups()
+        unit = DURATION_UNITS[unit]
+        if few:
+            return f"{few} {unit}s"
+        if article:
+            count = NUMBER_WORDS[article]
+            return f"{count} {unit}s" if count > 1 else f"1 {unit}"
+        low = _to_number(first)
+        high = _to_number(second)
+        amount = f"{first}-{second}" if high is not None else first
+        plural = (high or low) != 1
+        return f"{amount} {unit}{'s' if plural else ''}"
+
+    for pattern, template in _RELATIVE_DURATIONS:
+        match = pattern.search(text)
+        if match:
+            return template.format(match.group(0).strip(), match.group(match.lastindex))
+    return None
@@ -0,0 +1,59 @@
+"""
+Tests for appointment status changes and slot reservations
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import api.appointments as appointments
+
+CANCELLED = {
+    "appointment_id": "APT-1",
+    "doctor_id": "DOC001",
+    "appointment_date": "2026-11-02",
+    "appointment_time": "10:00 AM",
+    "status": "cancelled",
+}
+
+
+class VanishingRepository:
+    """The appointment is deleted between the lookup and the update"""
+
+    def get(self, appointment_id):
+        return dict(CANCELLED)
+
+    def update(self, appointment_id, **fields):
+        return None
+
+
+class RecordingSlotEngine:
+    def __init__(self):
+        self.calls = []
+
+    def reserve(self, doctor_id, start, holder):
+        self.calls.append(("reserve", holder))
+
+    def release(self, holder):
+        self.calls.append(("release", holder))
+        return True
+
+    def confirm(self, holder):
+        self.calls.append(("confirm", holder))
+
+
+def test_restoring_a_deleted_appointment_releases_the_slot(monkeypatch):
+    slots = RecordingSlotEngine()
+    monkeypatch.setattr(appointments, "appointment_repository", VanishingRepository())
+    monkeypatch.setattr(appointments, "slot_engine", slots)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(appointments.update_appointment_status("APT-1", "scheduled"))
+
+    assert error.value.status_code == 404
+    assert slots.calls == [("reserve", "APT-1"), ("release", "APT-1")]
@@ -0,0 +1,83 @@
+"""
+Tests for silence-based segmentation and segmented transcription
+"""
+import asyncio
+import sys
+import threading
+import wave
+from pathlib import Path
+
+import numpy as np
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from adapters.speech_to_text import SpeechToTextBackend
+import services.transcription as transcription
+from services.transcription import transcribe_recording
+
+RATE = 16000
+
+
+class DurationBackend(SpeechToTextBackend):
+    """Fake STT engine that "transcribes" a file as its length in seconds"""
+
+    def transcribe_file(self, audio_file_path: str) -> str:
+        with wave.open(audio_file_path, 'rb') as wav:
+            return f"{wav.getnframes() / wav.getframerate():.2f}"
+
+
+def write_wav(path: Path, samples: np.ndarray):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.astype(np.int16).tobytes())
+
+
+def transcribed_seconds(result) -> float:
+    return sum(float(segment["text"]) for segment in result["segments"])
+
+
+def test_quiet_speech_is_transcribed(tmp_path):
+    # Two minutes of a loud speaker, then a minute of a much quieter one, no pauses:
+    # the quiet part is far below the loud part's noise floor but still speech
+    rng = np.random.default_rng(0)
+    loud = rng.normal(0, 8000, 120 * RATE)
+    quiet = rng.normal(0, 300, 60 * RATE)
+    write_wav(tmp_path / "talk.wav", np.concatenate([loud, quiet]))
+
+    result = asyncio.run(transcribe_recording(str(tmp_path / "talk.wav"), DurationBackend()))
+
+    assert len(result["segments"]) > 1
+    assert abs(transcribed_seconds(result) - 180) < 0.1
+
+
+def test_only_digital_silence_is_skipped(tmp_path):
+    rng = np.random.default_rng(1)
+    speech = rng.normal(0, 3000, 70 * RATE)
+    write_wav(tmp_path / "tail.wav", np.concatenate([speech, np.zeros(70 * RATE)]))
+
+    result = asyncio.run(transcribe_recording(str(tmp_path / "tail.wav"), DurationBackend()))
+
+    # Everything up to the trailing silent segment is transcribed, the silence itself isn't
+    last_end = result["segments"][-1]["end"]
+    assert 70 <= last_end < 140
+    assert abs(transcribed_seconds(result) - last_end) < 0.1
+
+
+def test_splitting_runs_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    split_wav = transcription.split_wav
+
+    def recording_split_wav(path, out_dir):
+        threads.append(threading.get_ident())
+        return split_wav(path, out_dir)
+
+    monkeypatch.setattr(transcription, "split_wav", recording_split_wav)
+    rng = np.random.default_rng(2)
+    write_wav(tmp_path / "talk.wav", rng.normal(0, 3000, 90 * RATE))
+
+    asyncio.run(transcribe_recording(str(tmp_path / "talk.wav"), DurationBackend()))
+
+    assert threads and threads[0] != threading.get_ident()
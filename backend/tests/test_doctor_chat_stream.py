@@ -0,0 +1,54 @@
+"""
+Tests for the doctor chat SSE stream
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import api.doctor_chatbot as doctor_chatbot
+
+
+class FakeLLM:
+    def __init__(self, tokens, error=None):
+        self.tokens = tokens
+        self.error = error
+
+    async def stream_chat_response(self, messages, priority=None):
+        for token in self.tokens:
+            yield token
+        if self.error:
+            raise self.error
+
+
+def stream_events(monkeypatch, llm):
+    monkeypatch.setattr(doctor_chatbot, "get_llm", lambda: llm)
+    monkeypatch.setattr(doctor_chatbot, "build_chat_messages", lambda request: [])
+    request = doctor_chatbot.DoctorChatRequest(message="hi", doctor_id="DOC001")
+
+    async def collect():
+        response = await doctor_chatbot.doctor_chat_stream(request)
+        return [chunk async for chunk in response.body_iterator]
+
+    events = []
+    for chunk in asyncio.run(collect()):
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_complete_stream_reports_success(monkeypatch):
+    events = stream_events(monkeypatch, FakeLLM(["Hello", " doctor"]))
+    assert [event for event, _ in events] == ["token", "token", "done"]
+    assert events[-1][1]["success"] is True
+
+
+def test_cut_off_stream_reports_failure(monkeypatch):
+    events = stream_events(monkeypatch, FakeLLM(["Hello"], RuntimeError("upstream reset")))
+    assert events[0] == ("token", {"content": "Hello"})
+    assert events[-1][0] == "done"
+    assert events[-1][1]["success"] is False
+    assert events[-1][1]["error"] == "upstream reset"
@@ -0,0 +1,51 @@
+"""
+Tests for running without Azure OpenAI credentials
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+import adapters.azure_openai as azure_openai
+from config.config import Config
+from services.triage_agent import TriageAgent
+from utils import require_llm
+
+
+@pytest.fixture
+def no_credentials(monkeypatch):
+    monkeypatch.setattr(Config, "AZURE_OPENAI_KEY", "")
+    monkeypatch.delenv("AZURE_OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("AZURE_OPENAI_AD_TOKEN", raising=False)
+    monkeypatch.setattr(azure_openai, "_shared_async_client", None)
+
+
+def test_startup_without_credentials_leaves_client_unset(no_credentials):
+    asyncio.run(azure_openai.startup_llm_client())
+    assert azure_openai._shared_async_client is None
+    assert azure_openai.llm_available() is False
+
+
+def test_llm_routes_answer_503_without_credentials(no_credentials):
+    with pytest.raises(HTTPException) as error:
+        require_llm()
+    assert error.value.status_code == 503
+
+
+def test_no_connection_pool_is_built_without_credentials(no_credentials, monkeypatch):
+    built = []
+    monkeypatch.setattr(azure_openai.httpx, "AsyncClient", lambda *args, **kwargs: built.append(1))
+    for _ in range(3):
+        assert azure_openai.llm_available() is False
+    assert built == []
+
+
+def test_fast_path_turns_do_not_need_the_llm():
+    agent = TriageAgent.__new__(TriageAgent)
+    assert agent.needs_llm("about 7", {"issue": "chest pain"}) is False
+    assert agent.needs_llm("it started after lunch", {"issue": "chest pain"}) is True
@@ -0,0 +1,60 @@
+"""
+Tests for the session manifest
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.conversation_log import ConversationLog
+from services.session_index import SessionIndex
+
+
+def conversation(session_id, user_id="u1"):
+    return {
+        "session_id": session_id,
+        "user_id": user_id,
+        "created_at": "2026-01-01T10:00:00",
+        "messages": [],
+        "collected_info": {},
+        "status": "active",
+    }
+
+
+def test_first_load_drops_sessions_without_logs_and_adds_missing_ones(tmp_path):
+    log = ConversationLog(tmp_path / "conversations")
+    log.directory.mkdir()
+    log.create(conversation("kept"))
+    log.create(conversation("unlisted"))
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("".join(json.dumps(entry) + "\n" for entry in [
+        SessionIndex.entry_from_conversation(conversation("kept")),
+        SessionIndex.entry_from_conversation(conversation("orphan")),
+    ]))
+
+    index = SessionIndex(manifest, log)
+
+    assert sorted(index.session_ids("u1")) == ["kept", "unlisted"]
+    # The reconciled manifest is persisted, so other processes see it too
+    assert sorted(SessionIndex(manifest, log).session_ids()) == ["kept", "unlisted"]
+
+
+def test_reloads_when_rewritten_at_the_same_size(tmp_path):
+    log = ConversationLog(tmp_path / "conversations")
+    log.directory.mkdir()
+    log.create(conversation("s1"))
+    manifest = tmp_path / "manifest.jsonl"
+    index = SessionIndex(manifest, log)
+    assert index.get("s1")["status"] == "active"
+
+    # Another process rewrites the manifest with a same-length record
+    size = manifest.stat().st_size
+    manifest.write_text(json.dumps({**index.get("s1"), "status": "closed"}) + "\n")
+    assert manifest.stat().st_size == size
+    stat = manifest.stat()
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert index.get("s1")["status"] == "closed"
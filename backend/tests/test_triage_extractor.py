@@ -0,0 +1,92 @@
+"""
+Tests for the deterministic triage extractor and the agent's local fast path
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from services.triage_extractor import extract_duration, extract_pain_rating
+from services.triage_agent import TriageAgent
+
+
+@pytest.mark.parametrize("text, rating", [
+    ("7", 7),
+    ("about 6-7", 7),
+    ("8/10", 8),
+    ("5 out of 10", 5),
+    ("seven", 7),
+    ("pretty severe", 8),
+    ("about 7, for 3 days", 7),
+    ("it's a 7 and has lasted 2 or 3 days", 7),
+    ("pain is 6", 6),
+    ("about 4.", 4),
+    ("i'd say seven", 7),
+    ("7/10 pain", 7),
+])
+def test_pain_rating(text, rating):
+    assert extract_pain_rating(text) == rating
+
+
+@pytest.mark.parametrize("text", [
+    "about 2 or 3 days now",
+    "5 to 6 hours",
+    "2-3 weeks",
+    "3 days",
+    "I am 45 years old",
+    "at 3 pm",
+    "7 or 9, then 2",
+    "not severe",
+    "I took 2 tablets",
+    "I have 2 kids",
+    "what does 10 mean?",
+    "about 2 tablets",
+    "this one",
+    "at 7am",
+    "6-7 pm",
+])
+def test_pain_rating_ignores_durations_and_ambiguity(text):
+    assert extract_pain_rating(text) is None
+
+
+@pytest.mark.parametrize("text, duration", [
+    ("3 days", "3 days"),
+    ("about 2 or 3 days now", "2-3 days"),
+    ("5 to 6 hours", "5-6 hours"),
+    ("a couple of weeks", "2 weeks"),
+    ("since yesterday", "since yesterday"),
+    ("for 3 days, I am 45 years old", "3 days"),
+])
+def test_duration(text, duration):
+    assert extract_duration(text) == duration
+
+
+@pytest.mark.parametrize("text", [
+    "I am 45 years old",
+    "she is 8 years old",
+    "aged 45 years",
+    "7",
+])
+def test_duration_ignores_ages(text):
+    assert extract_duration(text) is None
+
+
+def test_fast_path_does_not_take_duration_as_pain_rating():
+    agent = TriageAgent.__new__(TriageAgent)
+    assert agent._fast_path_response("about 2 or 3 days now", {"issue": "chest pain"}) is None
+
+
+def test_fast_path_collects_rating_and_duration():
+    agent = TriageAgent.__new__(TriageAgent)
+    response = agent._fast_path_response("about 7, for 3 days", {"issue": "chest pain"})
+    assert response["collected_info"]["pain_rating"] == "7"
+    assert response["collected_info"]["duration"] == "3 days"
+    assert response["is_complete"] is True
+
+
+def test_fast_path_does_not_take_counts_as_pain_rating():
+    agent = TriageAgent.__new__(TriageAgent)
+    assert agent._fast_path_response("I took 2 tablets", {"issue": "headache"}) is None
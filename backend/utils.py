@@ -0,0 +1,42 @@
+"""
+Shared helpers for API routers
+"""
+import json
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from adapters.azure_openai import llm_available
+
+# Time formats seen in doctor slots and appointments ("2:00 PM", "14:00", ...)
+TIME_FORMATS = ["%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M", "%H:%M:%S"]
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def require_llm():
+    """Route dependency: 503 when the Azure OpenAI client isn't configured"""
+    if not llm_available():
+        raise HTTPException(status_code=503, detail="AI assistant is unavailable: Azure OpenAI is not configured")
+
+
+def parse_appointment_datetime(date_str: Optional[str], time_str: Optional[str]) -> Optional[datetime]:
+    """Parse an appointment's date ("YYYY-MM-DD") and time ("2:00 PM" or "14:00"); None if either is invalid"""
+    if not date_str or not time_str:
+        return None
+    try:
+        day = datetime.strptime(date_str.strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+    time_str = time_str.strip().upper()
+    for time_format in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(time_str, time_format)
+        except ValueError:
+            continue
+        return day.replace(hour=parsed.hour, minute=parsed.minute, second=parsed.second)
+    return None
@@ -729,6 +729,23 @@ export const DoctorDashboard: React.FC = () => {
     };
 
     loadAppointments();
+
+    // Reload when the backend pushes a queue or appointment change (no polling)
+    if (!user || user.role !== 'doctor') return;
+    const doctorId = user.id || 'doc1';
+    const events = new EventSource(`${API_BASE_URL}/api/appointments/queue/doctor/${doctorId}/events`);
+    const changeEvents = [
+      'patient_added',
+      'patient_updated',
+      'patient_removed',
+      'appointment_scheduled',
+      'appointment_updated',
+      'resync',
+    ];
+    const handleChange = () => loadAppointments();
+    changeEvents.forEach((name) => events.addEventListener(name, handleChange));
+
+    return () => events.close();
   }, [user]);
 
   const handlePatientClick = async (patient: QueuePatient) => {